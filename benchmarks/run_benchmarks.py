@@ -0,0 +1,360 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("", "task2_src", "task4", "task5"):
+    path = os.path.join(ROOT, sub)
+    if path not in sys.path:
+        sys.path.append(path)
+
+HISTORY_FILE = os.path.join(ROOT, "benchmarks", "history.json")
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+UK_ALPHABET = "абвгґдеєжзиіїйклмнопрстуфхцчшщьюя"
+
+# temporary directories of the running case, removed once it finishes
+_TEMP_DIRS = []
+
+
+# ---------------------------------------------------------------- synthetic inputs
+
+def _temp_dir(prefix):
+    directory = tempfile.mkdtemp(prefix=prefix)
+    _TEMP_DIRS.append(directory)
+    return directory
+
+
+def random_text(n_chars, seed=0):
+    rng = random.Random(seed)
+    words = []
+    total = 0
+    while total < n_chars:
+        word = "".join(rng.choice(UK_ALPHABET) for _ in range(rng.randint(1, 10)))
+        if rng.random() < 0.1:
+            word += rng.choice(",.!?")
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:n_chars]
+
+
+def corrupt(text, rate=0.05, seed=1):
+    """
+    Hypothesis-like copy of text: random substitutions, deletions and insertions.
+    """
+    rng = random.Random(seed)
+    out = []
+    for char in text:
+        r = rng.random()
+        if r < rate / 3:
+            out.append(rng.choice(UK_ALPHABET))
+        elif r < 2 * rate / 3:
+            continue
+        elif r < rate:
+            out.append(char + rng.choice(UK_ALPHABET))
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def tiny_punctuation_model(directory):
+    """
+    Randomly initialized BERT token classifier + WordPiece tokenizer saved to `directory`.
+    """
+    import torch
+    from transformers import BertConfig, BertForTokenClassification, BertTokenizerFast
+
+    vocab = ["[PAD]"] + [f"[unused{i}]" for i in range(99)] + ["[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += list(UK_ALPHABET) + ["##" + c for c in UK_ALPHABET] + list(".,?!")
+    with open(os.path.join(directory, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab) + "\n")
+    tokenizer = BertTokenizerFast(os.path.join(directory, "vocab.txt"), model_max_length=128)
+
+    labels = ["ooO", "oo,", "oo.", "AaO", "Aa,", "Aa.", "oo?", "oo!"]
+    config = BertConfig(vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=128, max_position_embeddings=128, num_labels=len(labels),
+                        id2label=dict(enumerate(labels)), label2id={l: i for i, l in enumerate(labels)})
+    torch.manual_seed(0)
+    model = BertForTokenClassification(config).eval()
+    return model, tokenizer
+
+
+def tiny_separation_model():
+    import torch
+    from asteroid.models import ConvTasNet
+
+    torch.manual_seed(0)
+    return ConvTasNet(n_src=2, n_blocks=2, n_repeats=1, bn_chan=32, hid_chan=64, skip_chan=32,
+                      n_filters=64, sample_rate=8000).eval()
+
+
+def synthetic_mixture(seconds, sample_rate=8000, seed=0):
+    """
+    Two sources (a chirp-ish sine and noise) and their sum, as float32 numpy arrays.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    s1 = 0.3 * np.sin(2 * np.pi * (200 + 50 * t) * t)
+    s2 = 0.1 * rng.standard_normal(len(t))
+    return s1.astype(np.float32), s2.astype(np.float32), (s1 + s2).astype(np.float32)
+
+
+# ---------------------------------------------------------------- cases
+# every case returns (run, items_per_run, unit); run() is timed repeatedly
+
+def case_clean_text(n_chars):
+    from task_2 import clean_text
+
+    text = random_text(n_chars)
+    return lambda: clean_text(text), n_chars, "chars"
+
+
+def case_calculate_metrics(n_chars, mode, counts_only=False):
+    from task_2 import calculate_metrics, clean_text
+
+    ref = clean_text(random_text(n_chars))
+    hyp = clean_text(corrupt(ref))
+    return lambda: calculate_metrics(ref, hyp, mode=mode, counts_only=counts_only), n_chars, "chars"
+
+
+def case_word_predictions(n_texts, batched):
+    from uk_puntcase.get_predictions import get_word_predictions, get_word_predictions_batched
+
+    directory = _temp_dir("bench_punct_")
+    model, tokenizer = tiny_punctuation_model(directory)
+    texts = [random_text(300, seed=i) for i in range(n_texts)]
+    if batched:
+        run = lambda: get_word_predictions_batched(model, tokenizer, texts, batch_size=32)
+    else:
+        run = lambda: get_word_predictions(model, tokenizer, texts)
+    return run, n_texts, "texts"
+
+
+def case_separate_audio(seconds, streaming):
+    directory = _temp_dir("bench_sep_")
+    os.environ["AUDIO_CACHE_DIR"] = os.path.join(directory, "cache")
+    import soundfile
+    from separate import separate_audio, separate_audio_streaming
+
+    mix_path = os.path.join(directory, "mix.wav")
+    soundfile.write(mix_path, synthetic_mixture(seconds)[2], 8000)
+    model = tiny_separation_model()
+    if streaming:
+        run = lambda: separate_audio_streaming(mix_path, output_dir=directory, model=model, chunk_seconds=4.0)
+    else:
+        run = lambda: separate_audio(mix_path, output_dir=directory, model=model)
+    return run, seconds, "audio_s"
+
+
+def case_calculate_snr(seconds):
+    directory = _temp_dir("bench_snr_")
+    os.environ["AUDIO_CACHE_DIR"] = os.path.join(directory, "cache")
+    import soundfile
+    from evaluate_snr import calculate_snr
+
+    s1, s2, mix = synthetic_mixture(seconds)
+    ref_path = os.path.join(directory, "ref.wav")
+    est_path = os.path.join(directory, "est.wav")
+    soundfile.write(ref_path, s1, 8000)
+    soundfile.write(est_path, s1 + 0.1 * s2, 8000)
+    return lambda: calculate_snr(est_path, ref_path), seconds, "audio_s"
+
+
+def case_snr_matrix(seconds, n_src):
+    import torch
+    from evaluate_snr import si_sdr_matrix, snr_matrix
+
+    torch.manual_seed(0)
+    ref = torch.randn(n_src, int(seconds * 8000))
+    est = ref.flip(0) + 0.1 * torch.randn_like(ref)
+    return lambda: (snr_matrix(est, ref), si_sdr_matrix(est, ref)), seconds * n_src, "audio_s"
+
+
+def case_cold_start(export):
+    """
+    Fresh interpreter: imports, punctuation model load and the first result,
+    from_pretrained (export=None) or from an exported artifact.
+    """
+    directory = _temp_dir("bench_cold_")
+    model, tokenizer = tiny_punctuation_model(directory)
+    model.save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    # outside the model directory, whose file listing is part of the export key
+    env = dict(os.environ, MODEL_EXPORT_DIR=_temp_dir("bench_exported_"))
+    script = (f"import sys; sys.path[:0] = {[ROOT, os.path.join(ROOT, 'task4')]!r}\n"
+              "from common.model_registry import get_model\n"
+              "from uk_puntcase.get_predictions import get_word_predictions_batched\n"
+              f"model, tokenizer = get_model('token-classification', {directory!r}, export={export!r})\n"
+              "get_word_predictions_batched(model, tokenizer, ['привіт як справи'])\n")
+    run = lambda: subprocess.run([sys.executable, "-c", script], env=env, check=True, capture_output=True)
+    if export:
+        # the first run exports the artifact
+        run()
+    return run, 1, "runs"
+
+
+CASES = {
+    "clean_text/10k": (case_clean_text, dict(n_chars=10_000)),
+    "clean_text/200k": (case_clean_text, dict(n_chars=200_000)),
+    "wer/5k": (case_calculate_metrics, dict(n_chars=5_000, mode="word")),
+    "wer/50k": (case_calculate_metrics, dict(n_chars=50_000, mode="word")),
+    "cer/1k": (case_calculate_metrics, dict(n_chars=1_000, mode="char")),
+    "cer/4k": (case_calculate_metrics, dict(n_chars=4_000, mode="char")),
+    "cer/4k-counts": (case_calculate_metrics, dict(n_chars=4_000, mode="char", counts_only=True)),
+    "cer/20k": (case_calculate_metrics, dict(n_chars=20_000, mode="char")),
+    "punct/per-sentence": (case_word_predictions, dict(n_texts=16, batched=False)),
+    "punct/batched": (case_word_predictions, dict(n_texts=16, batched=True)),
+    "separate/10s": (case_separate_audio, dict(seconds=10, streaming=False)),
+    "separate/30s-streaming": (case_separate_audio, dict(seconds=30, streaming=True)),
+    "snr/20s": (case_calculate_snr, dict(seconds=20)),
+    "snr-matrix/20s-x3": (case_snr_matrix, dict(seconds=20, n_src=3)),
+    "cold-start/eager": (case_cold_start, dict(export=None)),
+    "cold-start/torchscript": (case_cold_start, dict(export="torchscript")),
+}
+
+
+# ---------------------------------------------------------------- harness
+
+def _percentile(values, q):
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def run_case(name, repeats, warmup):
+    """
+    Runs one case (meant to be called in a fresh process, so peak RSS is per case).
+    """
+    factory, params = CASES[name]
+    try:
+        run, items, unit = factory(**params)
+        for _ in range(warmup):
+            run()
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            latencies.append(time.perf_counter() - start)
+    except Exception as e:
+        return {"name": name, "error": f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"}
+    finally:
+        # inputs, outputs and exported models of the case
+        while _TEMP_DIRS:
+            shutil.rmtree(_TEMP_DIRS.pop(), ignore_errors=True)
+
+    total = sum(latencies)
+    return {
+        "name": name,
+        "unit": unit,
+        "repeats": repeats,
+        "throughput": items * repeats / total if total > 0 else 0.0,
+        "p50_ms": 1000 * _percentile(latencies, 0.50),
+        "p90_ms": 1000 * _percentile(latencies, 0.90),
+        "p99_ms": 1000 * _percentile(latencies, 0.99),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_isolated(name, repeats, warmup):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_case, (name, repeats, warmup))
+
+
+def compare(results, baseline, tolerance):
+    """
+    Flags cases whose throughput dropped or p50 latency grew by more than `tolerance`,
+    and cases that fail now but ran in the baseline.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result["name"])
+        if not base or "error" in base:
+            continue
+        if "error" in result:
+            regressions.append(f"{result['name']}: failed ({result['error']}), the baseline ran")
+            continue
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['name']}: throughput {result['throughput']:.1f} < "
+                               f"baseline {base['throughput']:.1f} {result['unit']}/s")
+        if result["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: p50 {result['p50_ms']:.2f}ms > baseline {base['p50_ms']:.2f}ms")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_json(path, default):
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for scoring, punctuation, separation and SNR.")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this string")
+    parser.add_argument("-n", "--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--no-isolate", action="store_true", help="run all cases in this process")
+    args = parser.parse_args()
+
+    results = []
+    for name in CASES:
+        if args.filter not in name:
+            continue
+        if args.no_isolate:
+            result = run_case(name, args.repeats, args.warmup)
+        else:
+            result = run_isolated(name, args.repeats, args.warmup)
+        results.append(result)
+        if "error" in result:
+            print(f"{name:<26} ERROR {result['error']}")
+        else:
+            print(f"{name:<26} {result['throughput']:>12.1f} {result['unit']}/s | "
+                  f"p50 {result['p50_ms']:>9.2f}ms p90 {result['p90_ms']:>9.2f}ms p99 {result['p99_ms']:>9.2f}ms | "
+                  f"RSS {result['peak_rss_mb']:.0f}MB")
+
+    run = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": _git_commit(), "results": results}
+    history = _load_json(args.history, [])
+    history.append(run)
+    with open(args.history, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+
+    baseline = {r["name"]: r for r in _load_json(args.baseline, {}).get("results", [])}
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"[REGRESSION] {line}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"Saved baseline: {args.baseline}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
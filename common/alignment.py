@@ -0,0 +1,90 @@
+import numpy as np
+
+# edit op codes
+OK, SUB, DEL, INS = 0, 1, 2, 3
+OP_NAMES = ("OK", "S", "D", "I")
+
+_MISSING = '""'
+_ITER_BLOCK = 4096
+
+
+class Alignment:
+    """
+    Array-backed alignment table.
+    vocab -> list of tokens, shared by both sides
+    ref   -> int32 token ids of the reference side (-1 for insertions)
+    hyp   -> int32 token ids of the hypothesis side (-1 for deletions)
+    ops   -> uint8 op codes (OK, SUB, DEL, INS)
+
+    Iterating yields the old (ref, hyp, type) tuples lazily, so it can be used
+    anywhere the plain list was used (print_results, print_results_csv).
+    """
+
+    __slots__ = ("vocab", "ref", "hyp", "ops")
+
+    def __init__(self, vocab, ref, hyp, ops):
+        self.vocab = vocab
+        self.ref = np.asarray(ref, dtype=np.int32)
+        self.hyp = np.asarray(hyp, dtype=np.int32)
+        self.ops = np.asarray(ops, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Alignment(self.vocab, self.ref[key], self.hyp[key], self.ops[key])
+        return self._row(int(self.ref[key]), int(self.hyp[key]), int(self.ops[key]))
+
+    def __iter__(self):
+        for start in range(0, len(self.ops), _ITER_BLOCK):
+            stop = start + _ITER_BLOCK
+            for r, h, op in zip(self.ref[start:stop].tolist(), self.hyp[start:stop].tolist(), self.ops[start:stop].tolist()):
+                yield self._row(r, h, op)
+
+    def __getstate__(self):
+        return self.vocab, self.ref, self.hyp, self.ops
+
+    def __setstate__(self, state):
+        self.vocab, self.ref, self.hyp, self.ops = state
+
+    def _row(self, r, h, op):
+        if op == OK:
+            return self.vocab[r], "*", "OK"
+        if op == SUB:
+            return self.vocab[r], self.vocab[h], "S"
+        if op == DEL:
+            return self.vocab[r], _MISSING, "D"
+        return _MISSING, self.vocab[h], "I"
+
+    def to_list(self):
+        return list(self)
+
+    def counts(self):
+        """
+        Number of rows per op type, e.g. {'OK': 91, 'S': 15, 'D': 2, 'I': 3}.
+        """
+        per_op = np.bincount(self.ops, minlength=len(OP_NAMES))
+        return {name: int(per_op[code]) for code, name in enumerate(OP_NAMES)}
+
+    def confusions(self, top=10, op=SUB):
+        """
+        Most frequent (ref, hyp) pairs for the given op (substitutions by default),
+        as a list of ((ref, hyp), count) sorted by count.
+        """
+        mask = self.ops == op
+        if not mask.any():
+            return []
+        # shift by 1 so that -1 (missing side) becomes 0
+        width = len(self.vocab) + 1
+        keys = (self.ref[mask].astype(np.int64) + 1) * width + (self.hyp[mask].astype(np.int64) + 1)
+        uniq, cnt = np.unique(keys, return_counts=True)
+        order = np.argsort(-cnt, kind="stable")[:top]
+
+        pairs = []
+        for k in order:
+            r, h = divmod(int(uniq[k]), width)
+            ref_tok = self.vocab[r - 1] if r > 0 else _MISSING
+            hyp_tok = self.vocab[h - 1] if h > 0 else _MISSING
+            pairs.append(((ref_tok, hyp_tok), int(cnt[k])))
+        return pairs
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from common.instrumentation import count, timer
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "AUDIO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "voicerecognition_labs", "audio"))
+DEFAULT_MAX_BYTES = int(os.environ.get("AUDIO_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+_resamplers = {}
+_resamplers_lock = threading.Lock()
+
+
+def get_resampler(src_sr, dst_sr):
+    """
+    One torchaudio Resample module (and its precomputed kernel) per (src_sr, dst_sr).
+    """
+    import torchaudio
+
+    with _resamplers_lock:
+        if (src_sr, dst_sr) not in _resamplers:
+            _resamplers[(src_sr, dst_sr)] = torchaudio.transforms.Resample(src_sr, dst_sr)
+        return _resamplers[(src_sr, dst_sr)]
+
+
+def decode_audio(path, target_sr=None):
+    """
+    Decodes a file to mono float32 at target_sr (native rate if None).
+    Returns (numpy array [time], sample_rate).
+    """
+    import torch
+    import torchaudio
+
+    with timer("audio.decode"):
+        tensor, sr = torchaudio.load(path)
+    if target_sr is not None and sr != target_sr:
+        with timer("audio.resample"):
+            tensor = get_resampler(sr, target_sr)(tensor)
+        sr = target_sr
+    if tensor.shape[0] > 1:
+        tensor = torch.mean(tensor, dim=0, keepdim=True)
+    return tensor[0].numpy().astype(np.float32, copy=False), sr
+
+
+class AudioCache:
+    """
+    Decoded mono float32 audio stored as .npy files, keyed by (path, mtime, size, target_sr),
+    and opened with mmap_mode on repeat loads, so a second evaluation of the same
+    reference is a page-cache read instead of an MP3 decode + resample.
+    The directory is kept under max_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, path, target_sr):
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{target_sr}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npy"), os.path.join(self.cache_dir, f"{digest}.sr")
+
+    def load(self, path, target_sr=None):
+        """
+        Returns (numpy array [time], sample_rate); the array is a copy-on-write memory map.
+        """
+        npy_path, sr_path = self._entry_path(path, target_sr)
+        if os.path.exists(npy_path) and os.path.exists(sr_path):
+            self.hits += 1
+            count("audio.cache_hits")
+            with open(sr_path) as f:
+                sr = int(f.read())
+            os.utime(npy_path)  # mark as recently used
+            return np.load(npy_path, mmap_mode='c'), sr
+
+        self.misses += 1
+        count("audio.cache_misses")
+        audio, sr = decode_audio(path, target_sr)
+        if audio.nbytes > self.max_bytes:
+            # could never stay in the cache, serve the decoded array directly
+            return audio, sr
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{npy_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, audio)
+        os.replace(tmp_path, npy_path)
+        with open(sr_path, 'w') as f:
+            f.write(str(sr))
+        self.evict(keep=npy_path)
+        try:
+            return np.load(npy_path, mmap_mode='c'), sr
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            return audio, sr
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the directory fits max_bytes;
+        keep -> entry that is never removed (the one just written).
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                full = os.path.join(self.cache_dir, name)
+                if full == keep:
+                    continue
+                stat = os.stat(full)
+                entries.append((stat.st_mtime, stat.st_size, full))
+
+        total = sum(size for _, size, _ in entries) + (os.path.getsize(keep) if keep else 0)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for victim in (full, full[:-4] + '.sr'):
+                if os.path.exists(victim):
+                    os.remove(victim)
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(('.npy', '.sr')):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+AUDIO_CACHE = AudioCache()
+
+
+def load_audio(path, target_sr=None, cache=True):
+    """
+    torchaudio.load replacement for the task scripts: mono float32 tensor [1, time]
+    at target_sr (native rate if None), served from AUDIO_CACHE when cache=True.
+    """
+    import torch
+
+    if cache:
+        audio, sr = AUDIO_CACHE.load(path, target_sr)
+    else:
+        audio, sr = decode_audio(path, target_sr)
+    return torch.from_numpy(audio).unsqueeze(0), sr
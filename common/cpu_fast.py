@@ -0,0 +1,86 @@
+import warnings
+
+import torch
+from torch import nn
+
+CPU_FAST = "cpu-fast"
+# cpu-fast with the 1x1 convolutions rewritten as Linear layers first, so ConvTasNet gets quantized too
+CPU_FAST_POINTWISE = "cpu-fast-pointwise"
+
+
+class PointwiseLinear(nn.Module):
+    """
+    A 1x1 Conv1d ([batch, channels, time]) computed as a Linear over the channel axis,
+    so dynamic quantization (which only handles Linear/LSTM) can pick it up.
+    """
+
+    def __init__(self, conv):
+        super().__init__()
+        self.linear = nn.Linear(conv.in_channels, conv.out_channels, bias=conv.bias is not None)
+        with torch.no_grad():
+            self.linear.weight.copy_(conv.weight[:, :, 0])
+            if conv.bias is not None:
+                self.linear.bias.copy_(conv.bias)
+
+    def forward(self, x):
+        return self.linear(x.transpose(-1, -2)).transpose(-1, -2)
+
+
+def _is_pointwise(module):
+    return (isinstance(module, nn.Conv1d) and module.kernel_size == (1,) and module.stride == (1,)
+            and module.padding == (0,) and module.dilation == (1,) and module.groups == 1
+            and module.padding_mode == 'zeros')
+
+
+def pointwise_convs_to_linear(model):
+    """
+    Replaces every 1x1 Conv1d in place (ConvTasNet bottleneck, residual, skip and mask convs).
+    Returns the number of replaced layers.
+    """
+    replaced = 0
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if _is_pointwise(child):
+                setattr(module, name, PointwiseLinear(child))
+                replaced += 1
+    return replaced
+
+
+def configure_threads(intra_op=None, inter_op=None):
+    """
+    intra_op -> threads used inside one op (matmul, conv), torch.set_num_threads
+    inter_op -> threads running independent ops in parallel, torch.set_num_interop_threads;
+                can only be set before the first parallel work of the process
+    """
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            print(f"[WARNING] inter-op threads not changed: {e}")
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def optimize_for_cpu(model, quantize=True, pointwise=False):
+    """
+    "cpu-fast" variant of a model for CPU-only inference:
+    1. optionally, 1x1 Conv1d layers become Linear layers (pointwise=True), so they are quantized too,
+    2. Linear and LSTM weights are dynamically quantized to int8 with torch.ao
+       (activations are quantized on the fly per batch),
+    3. the model is put in eval mode; run it under torch.inference_mode().
+    The model is modified in place and returned.
+
+    Transformer token classifiers are mostly Linear layers and gain the most. ConvTasNet is
+    Conv1d-only, so without pointwise=True only inference_mode applies; the pointwise
+    rewrite adds transposes that can cost more than int8 saves, check it with the accuracy guard.
+    """
+    model.eval()
+    if pointwise:
+        pointwise_convs_to_linear(model)
+    if quantize:
+        with warnings.catch_warnings():
+            # torch.ao eager-mode quantization warns about its planned move to torchao
+            warnings.simplefilter("ignore")
+            model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear, nn.LSTM}, dtype=torch.qint8, inplace=True)
+    return model
@@ -0,0 +1,263 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# VOICERECOGNITION_INSTRUMENTATION=stdout | jsonl:<path> | prometheus:<path>  -> enable timers/counters, export at exit
+# VOICERECOGNITION_PROFILE=cprofile | torch  -> capture profile() blocks into PROFILE_DIR
+#   (namespaced: generic INSTRUMENTATION/PROFILE variables in the shell belong to other tools)
+PROFILE_DIR = os.environ.get("VOICERECOGNITION_PROFILE_DIR", "profiles")
+
+_NULL = nullcontext()
+
+
+class Metrics:
+    """
+    Stage timers (calls, total/min/max seconds) and item counters (tokens, samples, sentences...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            stat = self.timers.get(name)
+            if stat is None:
+                self.timers[name] = [1, seconds, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2] = min(stat[2], seconds)
+                stat[3] = max(stat[3], seconds)
+
+    def add_count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            timers = {
+                name: {"calls": calls, "total_s": total, "mean_s": total / calls, "min_s": low, "max_s": high}
+                for name, (calls, total, low, high) in self.timers.items()
+            }
+            counters = dict(self.counters)
+        return {"time": time.time(), "pid": os.getpid(), "argv": sys.argv, "timers": timers, "counters": counters}
+
+
+class StdoutExporter:
+    def export(self, snapshot):
+        print("\n--- Stage timings ---")
+        for name, stat in sorted(snapshot["timers"].items()):
+            print(f"{name:<32} calls={stat['calls']:<6} total={stat['total_s']:.4f}s "
+                  f"mean={stat['mean_s'] * 1000:.2f}ms max={stat['max_s'] * 1000:.2f}ms")
+        if snapshot["counters"]:
+            print("--- Counters ---")
+            for name, value in sorted(snapshot["counters"].items()):
+                print(f"{name:<32} {value}")
+
+
+class JsonlExporter:
+    """
+    Appends one JSON line per run, so several runs can be compared later.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, snapshot):
+        with open(self.path, mode='a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+
+
+class PrometheusExporter:
+    """
+    Prometheus text exposition format, written atomically (node_exporter textfile collector).
+    """
+
+    def __init__(self, path, prefix="voicerecognition"):
+        self.path = path
+        self.prefix = prefix
+
+    def export(self, snapshot):
+        p = self.prefix
+        lines = [
+            f"# TYPE {p}_stage_seconds_total counter",
+            *(f'{p}_stage_seconds_total{{stage="{name}"}} {stat["total_s"]}'
+              for name, stat in sorted(snapshot["timers"].items())),
+            f"# TYPE {p}_stage_calls_total counter",
+            *(f'{p}_stage_calls_total{{stage="{name}"}} {stat["calls"]}'
+              for name, stat in sorted(snapshot["timers"].items())),
+            f"# TYPE {p}_stage_max_seconds gauge",
+            *(f'{p}_stage_max_seconds{{stage="{name}"}} {stat["max_s"]}'
+              for name, stat in sorted(snapshot["timers"].items())),
+            f"# TYPE {p}_items_total counter",
+            *(f'{p}_items_total{{counter="{name}"}} {value}'
+              for name, value in sorted(snapshot["counters"].items())),
+        ]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, mode='w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+def make_exporter(spec):
+    """
+    "stdout" | "jsonl:<path>" | "prometheus:<path>" -> exporter
+    """
+    kind, _, path = spec.partition(":")
+    if kind == "stdout":
+        return StdoutExporter()
+    if kind == "jsonl":
+        return JsonlExporter(path or "metrics.jsonl")
+    if kind == "prometheus":
+        return PrometheusExporter(path or "metrics.prom")
+    raise ValueError(f"Unknown exporter: {spec}")
+
+
+METRICS = Metrics()
+ENABLED = False
+PROFILER = None
+_exporters = []
+
+
+def enable(exporters=()):
+    global ENABLED
+    ENABLED = True
+    _exporters.extend(make_exporter(e) if isinstance(e, str) else e for e in exporters)
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def export():
+    snapshot = METRICS.snapshot()
+    for exporter in _exporters:
+        exporter.export(snapshot)
+    return snapshot
+
+
+class _Timer:
+    __slots__ = ("name", "start", "record")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        # stages show up as labelled ranges in torch.profiler traces
+        self.record = None
+        if PROFILER == "torch" and "torch" in sys.modules:
+            self.record = sys.modules["torch"].profiler.record_function(self.name)
+            self.record.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        METRICS.add_time(self.name, time.perf_counter() - self.start)
+        if self.record is not None:
+            self.record.__exit__(*exc)
+        return False
+
+
+def timer(name):
+    """
+    with timer("separate.forward"): ...
+    A shared no-op context when instrumentation is disabled.
+    """
+    return _Timer(name) if ENABLED else _NULL
+
+
+def timed(name=None):
+    """
+    Decorator form of timer(); the stage name defaults to module.function.
+    """
+    def decorator(func):
+        stage = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _Timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    if ENABLED:
+        METRICS.add_count(name, value)
+
+
+_profile_runs = 0
+
+
+@contextmanager
+def _profile(name):
+    global _profile_runs
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    _profile_runs += 1
+    base = os.path.join(PROFILE_DIR, f"{name}-{os.getpid()}-{_profile_runs}")
+
+    if PROFILER == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{base}.prof")
+            print(f"Profile saved: {base}.prof")
+    else:
+        import torch
+
+        with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU]) as profiler:
+            yield
+        profiler.export_chrome_trace(f"{base}.json")
+        print(f"Profile saved: {base}.json")
+
+
+def profile(name):
+    """
+    Captures the block with cProfile (.prof, open with snakeviz/pstats) or
+    torch.profiler (.json, open in chrome://tracing) when VOICERECOGNITION_PROFILE is set.
+    """
+    return _profile(name) if PROFILER else _NULL
+
+
+def configure_from_env():
+    global PROFILER
+    spec = os.environ.get("VOICERECOGNITION_INSTRUMENTATION")
+    if spec:
+        # runs at import time, a bad value must not break every script importing this module
+        try:
+            exporters = [make_exporter(s.strip()) for s in spec.split(",")]
+        except ValueError as e:
+            print(f"[WARNING] {e} in VOICERECOGNITION_INSTRUMENTATION={spec!r} "
+                  f"(expected stdout, jsonl:<path> or prometheus:<path>), instrumentation disabled",
+                  file=sys.stderr)
+        else:
+            enable(exporters)
+            atexit.register(export)
+
+    PROFILER = os.environ.get("VOICERECOGNITION_PROFILE") or None
+    if PROFILER not in (None, "cprofile", "torch"):
+        print(f"[WARNING] Unknown VOICERECOGNITION_PROFILE={PROFILER!r} (expected cprofile or torch), "
+              f"profiling disabled", file=sys.stderr)
+        PROFILER = None
+
+
+configure_from_env()
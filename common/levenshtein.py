@@ -0,0 +1,206 @@
+from math import isqrt
+
+import numpy as np
+
+from common.alignment import OK, SUB, DEL, INS
+
+# bytes of column bit-vectors kept at once for the backtrace; longer inputs are
+# recomputed block by block from checkpoints, so memory stays bounded
+_BLOCK_BYTES = 64 << 20
+# tokens with fewer occurrences get their match mask from shifts instead of np.packbits
+_SPARSE_TOKEN = 32
+
+
+def encode_tokens(ref_tokens, hyp_tokens):
+    """
+    Maps both token sequences to integer ids from one shared vocabulary,
+    so the DP compares ints instead of strings.
+    Returns (ref_ids, hyp_ids, vocab) where vocab[id] -> token.
+    """
+    index = {}
+    vocab = []
+    for tok in ref_tokens:
+        if tok not in index:
+            index[tok] = len(vocab)
+            vocab.append(tok)
+    for tok in hyp_tokens:
+        if tok not in index:
+            index[tok] = len(vocab)
+            vocab.append(tok)
+
+    ref_ids = np.fromiter((index[t] for t in ref_tokens), dtype=np.int64, count=len(ref_tokens))
+    hyp_ids = np.fromiter((index[t] for t in hyp_tokens), dtype=np.int64, count=len(hyp_tokens))
+    return ref_ids, hyp_ids, vocab
+
+
+def _match_masks(rows, cols):
+    """
+    token id -> int bitmask of the rows holding it (bit i set if rows[i] == id),
+    only for ids that also occur in cols.
+    """
+    masks = {}
+    if len(rows) == 0 or len(cols) == 0:
+        return masks
+    order = np.argsort(rows, kind="stable")
+    ids = rows[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    stops = np.r_[starts[1:], len(ids)]
+    present = np.isin(ids[starts], cols)
+    bits = np.zeros(len(rows), dtype=bool)
+    for start, stop in zip(starts[present].tolist(), stops[present].tolist()):
+        positions = order[start:stop]
+        if stop - start < _SPARSE_TOKEN:
+            mask = 0
+            for p in positions.tolist():
+                mask |= 1 << p
+        else:
+            bits[positions] = True
+            mask = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+            bits[positions] = False
+        masks[int(ids[start])] = mask
+    return masks
+
+
+def _run_columns(masks, cols, n_rows, state, keep=None):
+    """
+    Bit-parallel DP (Myers/Hyyrö) over cols, one Python int per column vector.
+    state -> (Pv, Mv) of the column before cols: bit i set if D[i+1][j] - D[i][j] is +1 / -1
+    keep  -> optional list, gets (Pv, Mv, Ph, Mh) of every column, where Ph/Mh bit i is
+             set if D[i+1][j] - D[i+1][j-1] is +1 / -1
+    Returns the (Pv, Mv) of the last column.
+    """
+    full = (1 << n_rows) - 1
+    pv, mv = state
+    get = masks.get
+    for c in cols:
+        eq = get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv) & full
+        mh = pv & xh
+        # row 0 is D[0][j] = j, its horizontal delta is always +1
+        ph_in = ph << 1 | 1
+        pv = (mh << 1 | ~(xv | ph_in)) & full
+        mv = ph_in & xv
+        if keep is not None:
+            keep.append((pv, mv, ph, mh))
+    return pv, mv
+
+
+def levenshtein(ref_ids, hyp_ids, backtrace=True):
+    """
+    Minimum edit-distance alignment of two integer sequences.
+
+    The DP runs bit-parallel (Myers/Hyyrö): one column of the DP matrix is a pair of
+    Python ints holding the +1/-1 vertical deltas, so a column costs ~15 big-int
+    operations and the Python loop only runs over the shorter sequence.
+    The backtrace reads the deltas of the stored columns. When they would take more
+    than _BLOCK_BYTES, only every block-th column state is checkpointed and each
+    block is recomputed right before it is backtraced, so memory is
+    O(max(n, m) * sqrt(min(n, m))) bits instead of O(n * m).
+
+    Ties between optimal paths are broken the same way in any orientation, walking
+    back from the end: match/substitution first, then deletion, then insertion.
+    The S/I/D counts always come from that path, backtrace only decides whether
+    it is returned.
+
+    backtrace-> if False only the counts are returned
+
+    Returns dict with S, I, D, C, distance and (if backtrace) 'path':
+    (ref_pos, hyp_pos, edits) arrays in alignment order, where edits holds
+    alignment.OK/SUB/DEL/INS codes and the missing side position is -1.
+    """
+    ref_ids = np.asarray(ref_ids, dtype=np.int64)
+    hyp_ids = np.asarray(hyp_ids, dtype=np.int64)
+
+    # the longer sequence is bit-packed, the loop runs over the shorter one
+    transpose = len(hyp_ids) > len(ref_ids)
+    rows, cols = (hyp_ids, ref_ids) if transpose else (ref_ids, hyp_ids)
+    n_rows, n_cols = len(rows), len(cols)
+    # in the non-transposed orientation UP is a deletion, otherwise LEFT is
+    prefer_up = not transpose
+
+    masks = _match_masks(rows, cols)
+    row_list, col_list = rows.tolist(), cols.tolist()
+
+    column_bytes = 4 * (n_rows // 8 + 32)
+    if n_cols * column_bytes <= _BLOCK_BYTES:
+        block = max(n_cols, 1)
+    else:
+        block = max(isqrt(n_cols), _BLOCK_BYTES // column_bytes)
+    starts = list(range(0, n_cols, block))
+
+    # D[i][0] = i: every vertical delta of column 0 is +1
+    checkpoints = [((1 << n_rows) - 1, 0)]
+    for start, stop in zip(starts[:-1], starts[1:]):
+        checkpoints.append(_run_columns(masks, col_list[start:stop], n_rows, checkpoints[-1]))
+
+    row_path, col_path, edit_path = [], [], []
+    S = n_up = n_left = 0
+    i, j = n_rows, n_cols
+    for start, state in zip(reversed(starts), reversed(checkpoints)):
+        # columns[k] holds column start + k, columns[0] only its vertical deltas
+        columns = [state + (0, 0)]
+        _run_columns(masks, col_list[start:j], n_rows, state, keep=columns)
+        while j > start:
+            if i == 0:
+                op = 2
+            elif row_list[i - 1] == col_list[j - 1]:
+                op = 0
+            else:
+                b = i - 1
+                pv, _, ph, mh = columns[j - start]
+                prev_pv, prev_mv = columns[j - start - 1][:2]
+                # D[i][j] - D[i-1][j-1] = h(i, j) + v(i, j-1), a substitution fits if it is 1
+                if (ph >> b & 1) - (mh >> b & 1) + (prev_pv >> b & 1) - (prev_mv >> b & 1) == 1:
+                    op = 0
+                elif prefer_up:
+                    op = 1 if pv >> b & 1 else 2
+                else:
+                    op = 2 if ph >> b & 1 else 1
+
+            if op == 0:
+                i -= 1
+                j -= 1
+                if row_list[i] == col_list[j]:
+                    edit = OK
+                else:
+                    edit = SUB
+                    S += 1
+                row_pos, col_pos = i, j
+            elif op == 1:
+                i -= 1
+                n_up += 1
+                row_pos, col_pos = i, -1
+                edit = DEL if prefer_up else INS
+            else:
+                j -= 1
+                n_left += 1
+                row_pos, col_pos = -1, j
+                edit = INS if prefer_up else DEL
+            if backtrace:
+                row_path.append(row_pos)
+                col_path.append(col_pos)
+                edit_path.append(edit)
+
+    # column 0: the remaining rows are all UP moves
+    n_up += i
+    if backtrace:
+        row_path.extend(range(i - 1, -1, -1))
+        col_path.extend([-1] * i)
+        edit_path.extend([DEL if prefer_up else INS] * i)
+
+    distance = S + n_up + n_left
+    D, I = (n_left, n_up) if transpose else (n_up, n_left)
+    C = len(ref_ids) - S - D
+
+    result = {"distance": distance, "S": S, "I": I, "D": D, "C": C}
+    if backtrace:
+        row_pos = np.array(row_path[::-1], dtype=np.int64)
+        col_pos = np.array(col_path[::-1], dtype=np.int64)
+        edits = np.array(edit_path[::-1], dtype=np.uint8)
+        if transpose:
+            # rows were the hypothesis: swap back to (ref, hyp)
+            row_pos, col_pos = col_pos, row_pos
+        result["path"] = (row_pos, col_pos, edits)
+    return result
@@ -0,0 +1,276 @@
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from types import SimpleNamespace
+
+from common.result_cache import make_key
+
+DEFAULT_EXPORT_DIR = os.environ.get(
+    "MODEL_EXPORT_DIR", os.path.join(os.path.expanduser("~"), ".cache", "voicerecognition_labs", "exported"))
+FORMATS = ("torchscript", "onnx")
+# bumped when the artifact layout or the traced wrappers change
+EXPORT_VERSION = 1
+
+_ARTIFACTS = {"torchscript": "model.pt", "onnx": "model.onnx"}
+# same default as asteroid.utils.hub_utils, which is not imported to keep the lookup cheap
+_ASTEROID_CACHE = os.getenv("ASTEROID_CACHE", os.path.expanduser("~/.cache/torch/asteroid"))
+
+
+class TracedTokenClassifier:
+    """
+    Exported token classifier with the part of the transformers API get_predictions uses:
+    model(input_ids=..., attention_mask=...).logits and model.config.id2label.
+    config._commit_hash is the export key, so result cache entries follow the artifact.
+    """
+
+    def __init__(self, run, id2label, name, key):
+        self._run = run
+        self.config = SimpleNamespace(id2label=id2label, _name_or_path=name, _commit_hash=key)
+
+    def __call__(self, input_ids, attention_mask):
+        return SimpleNamespace(logits=self._run(input_ids, attention_mask))
+
+    forward = __call__
+
+    def eval(self):
+        return self
+
+
+class ExportedSeparator:
+    """
+    Exported asteroid separation model: model(wav) -> est_sources, model.sample_rate, model.get_model_args().
+    The trace is made on [batch, 1, time]; [time] and [batch, time] inputs are reshaped
+    around it like asteroid does, so the returned shapes match the eager model.
+    """
+
+    def __init__(self, run, sample_rate, model_args, name, key):
+        self._run = run
+        self.sample_rate = sample_rate
+        self._model_args = model_args
+        self.config = SimpleNamespace(_name_or_path=name, _commit_hash=key)
+
+    def get_model_args(self):
+        return dict(self._model_args)
+
+    def __call__(self, wav):
+        if wav.ndim == 1:
+            return self._run(wav.view(1, 1, -1)).squeeze(0)
+        if wav.ndim == 2:
+            return self._run(wav.unsqueeze(1))
+        return self._run(wav)
+
+    forward = __call__
+
+    def eval(self):
+        return self
+
+
+def _describe_files(path):
+    # (relative path, size, mtime) of every file, so an edited local checkpoint gets a new key
+    path = os.path.realpath(path)
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [path, stat.st_size, stat.st_mtime_ns]
+    files = []
+    for root, _, names in sorted(os.walk(path)):
+        for file_name in sorted(names):
+            stat = os.stat(os.path.join(root, file_name))
+            files.append([os.path.relpath(os.path.join(root, file_name), path), stat.st_size, stat.st_mtime_ns])
+    return [path, files]
+
+
+def source_revision(kind, name):
+    """
+    What the weights are built from, without loading them:
+    local file/dir -> its file sizes and modification times,
+    hub name       -> the locally cached snapshot (its path contains the commit hash).
+    None if the model was never downloaded.
+    """
+    if os.path.exists(name):
+        return _describe_files(name)
+    try:
+        if kind == "token-classification":
+            from huggingface_hub import snapshot_download
+            return _describe_files(snapshot_download(name, local_files_only=True))
+        from huggingface_hub import try_to_load_from_cache
+        repo_id, _, revision = name.partition("@")
+        path = try_to_load_from_cache(repo_id, "pytorch_model.bin", cache_dir=_ASTEROID_CACHE,
+                                      revision=revision or None)
+        return _describe_files(path) if isinstance(path, str) else None
+    except Exception:
+        return None
+
+
+def export_key(kind, name, revision, device='cpu', dtype=None, variant=None, fmt="torchscript"):
+    import torch
+
+    return make_key("model-export", EXPORT_VERSION, kind, name, revision, str(device),
+                    str(dtype) if dtype is not None else None, variant, fmt, torch.__version__)
+
+
+def _trace_inputs(kind, entry, device):
+    import torch
+
+    if kind == "token-classification":
+        model, _ = entry
+
+        # defined here so torch stays out of the module imports
+        class LogitsOnly(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, input_ids, attention_mask):
+                return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+        input_ids = (torch.arange(32).view(2, 16) % model.config.vocab_size).to(device)
+        # the second row is padded, so the masking branch is the one that gets traced
+        attention_mask = torch.ones(2, 16, dtype=torch.long, device=device)
+        attention_mask[1, 8:] = 0
+        return LogitsOnly(model).eval(), (input_ids, attention_mask)
+
+    sample_rate = int(entry.sample_rate)
+    return entry, (torch.randn(1, 1, sample_rate, device=device),)
+
+
+def _metadata(kind, entry, name, fmt, variant):
+    meta = {"kind": kind, "name": name, "format": fmt, "variant": variant}
+    if kind == "token-classification":
+        model, _ = entry
+        meta["id2label"] = {str(i): label for i, label in model.config.id2label.items()}
+    else:
+        meta["sample_rate"] = float(entry.sample_rate)
+        meta["model_args"] = entry.get_model_args()
+    return meta
+
+
+def export_model(kind, entry, path, name, fmt="torchscript", variant=None, device='cpu'):
+    """
+    Writes the artifact directory:
+    model.pt (TorchScript trace) or model.onnx, metadata.json and, for token classifiers,
+    the tokenizer files. The directory is written under a temporary name and renamed,
+    so concurrent runs never see a half-written artifact.
+    """
+    import torch
+
+    module, example = _trace_inputs(kind, entry, device)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(path))
+    try:
+        artifact = os.path.join(tmp, _ARTIFACTS[fmt])
+        with warnings.catch_warnings(), torch.inference_mode():
+            # jit/onnx deprecation and tracer warnings
+            warnings.simplefilter("ignore")
+            if fmt == "torchscript":
+                torch.jit.save(torch.jit.trace(module, example, strict=False, check_trace=False), artifact)
+            elif kind == "token-classification":
+                torch.onnx.export(module, example, artifact, input_names=["input_ids", "attention_mask"],
+                                  output_names=["logits"],
+                                  dynamic_axes={"input_ids": {0: "batch", 1: "tokens"},
+                                                "attention_mask": {0: "batch", 1: "tokens"},
+                                                "logits": {0: "batch", 1: "tokens"}})
+            else:
+                torch.onnx.export(module, example, artifact, input_names=["mixture"], output_names=["sources"],
+                                  dynamic_axes={"mixture": {0: "batch", 2: "time"}, "sources": {0: "batch", 2: "time"}})
+        if kind == "token-classification":
+            entry[1].save_pretrained(os.path.join(tmp, "tokenizer"))
+        with open(os.path.join(tmp, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(_metadata(kind, entry, name, fmt, variant), f, ensure_ascii=False, indent=2)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # another process exported the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _require_onnx():
+    try:
+        import onnx
+        import onnxruntime
+    except ImportError:
+        raise ImportError("ONNX artifacts require 'onnx' and 'onnxruntime'. Use format='torchscript' instead.")
+    return onnxruntime
+
+
+def _onnx_runner(path, device):
+    onnxruntime = _require_onnx()
+    import torch
+
+    providers = ["CUDAExecutionProvider", "CPUExecutionProvider"] if str(device).startswith("cuda") \
+        else ["CPUExecutionProvider"]
+    session = onnxruntime.InferenceSession(path, providers=providers)
+    names = [i.name for i in session.get_inputs()]
+
+    def run(*inputs):
+        feed = {n: x.detach().cpu().numpy() for n, x in zip(names, inputs)}
+        return torch.from_numpy(session.run(None, feed)[0]).to(device)
+    return run
+
+
+def _load_tokenizer(path):
+    # a saved fast tokenizer (tokenizer.json) does not need the AutoTokenizer machinery,
+    # which imports most of transformers
+    if os.path.isfile(os.path.join(path, "tokenizer.json")):
+        from transformers import PreTrainedTokenizerFast
+        return PreTrainedTokenizerFast.from_pretrained(path)
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(path)
+
+
+def load_exported(path, device='cpu'):
+    """
+    Artifact directory -> TracedTokenClassifier + tokenizer pair, or ExportedSeparator.
+    """
+    with open(os.path.join(path, "metadata.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    key = os.path.basename(path)
+    artifact = os.path.join(path, _ARTIFACTS[meta["format"]])
+    if meta["format"] == "torchscript":
+        import torch
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            run = torch.jit.load(artifact, map_location=device).eval()
+    else:
+        run = _onnx_runner(artifact, device)
+
+    if meta["kind"] == "token-classification":
+        id2label = {int(i): label for i, label in meta["id2label"].items()}
+        model = TracedTokenClassifier(run, id2label, meta["name"], key)
+        return model, _load_tokenizer(os.path.join(path, "tokenizer"))
+    return ExportedSeparator(run, meta["sample_rate"], meta["model_args"], meta["name"], key)
+
+
+def load_or_export(kind, name, load, device='cpu', dtype=None, variant=None, fmt="torchscript",
+                   export_dir=DEFAULT_EXPORT_DIR):
+    """
+    Exported model for (kind, name, source revision, device, dtype, variant, format, torch version):
+    1. an existing artifact for that config hash is loaded directly, skipping from_pretrained,
+    2. otherwise load() builds the eager model (or (model, tokenizer) pair), it is exported
+       once under <export_dir>/<config hash>/ and the artifact is loaded.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "onnx" and variant is not None:
+        raise ValueError("ONNX export supports fp32 models only, use format='torchscript' for variants")
+    if fmt == "onnx":
+        _require_onnx()
+
+    revision = source_revision(kind, name)
+    if revision is not None:
+        path = os.path.join(export_dir, export_key(kind, name, revision, device, dtype, variant, fmt))
+        if os.path.isfile(os.path.join(path, "metadata.json")):
+            return load_exported(path, device)
+
+    entry = load()
+    # a hub model downloaded just now only has a revision after load()
+    revision = source_revision(kind, name) if revision is None else revision
+    path = os.path.join(export_dir, export_key(kind, name, revision, device, dtype, variant, fmt))
+    print(f"Exporting {kind} model {name} to {path} ({fmt})...")
+    export_model(kind, entry, path, name, fmt, variant, device)
+    return load_exported(path, device)
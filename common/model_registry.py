@@ -0,0 +1,141 @@
+import threading
+from collections import OrderedDict
+
+
+def _load_token_classification(name, device, dtype):
+    from transformers import AutoTokenizer, AutoModelForTokenClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model = AutoModelForTokenClassification.from_pretrained(name)
+    model.to(device=device, dtype=dtype)
+    model.eval()
+    return model, tokenizer
+
+
+def _load_asteroid(name, device, dtype):
+    from asteroid.models import BaseModel
+
+    model = BaseModel.from_pretrained(name)
+    model.to(device=device, dtype=dtype)
+    model.eval()
+    return model
+
+
+LOADERS = {
+    # -> (model, tokenizer)
+    "token-classification": _load_token_classification,
+    # -> model
+    "asteroid": _load_asteroid,
+}
+
+
+def _optimize(kind, entry, variant):
+    if variant is None:
+        return entry
+    from common.cpu_fast import CPU_FAST, CPU_FAST_POINTWISE, optimize_for_cpu
+
+    if variant not in (CPU_FAST, CPU_FAST_POINTWISE):
+        raise ValueError(f"Unknown model variant: {variant}")
+    pointwise = variant == CPU_FAST_POINTWISE
+    if kind == "token-classification":
+        model, tokenizer = entry
+        return optimize_for_cpu(model, pointwise=pointwise), tokenizer
+    return optimize_for_cpu(entry, pointwise=pointwise)
+
+
+def _resolve_dtype(dtype):
+    if dtype is None or not isinstance(dtype, str):
+        return dtype
+    import torch
+    return getattr(torch, dtype)
+
+
+class ModelRegistry:
+    """
+    In-process model cache keyed by (kind, name, device, dtype, variant, export).
+    Models are loaded lazily on first get() and the least recently used one
+    is evicted once more than max_models are resident.
+    variant='cpu-fast' -> int8 dynamically quantized copy for CPU inference (see common.cpu_fast);
+                          asteroid models have no Linear/LSTM layers, so for them it only means eval mode.
+    variant='cpu-fast-pointwise' -> 'cpu-fast' after rewriting 1x1 convolutions as Linear layers,
+                          so ConvTasNet's bottleneck/residual/skip/mask convolutions are int8 too.
+    export='torchscript'|'onnx' -> model exported once to an artifact and loaded from it
+                                   on later runs, skipping from_pretrained (see common.model_export).
+    """
+
+    def __init__(self, max_models=4):
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def get(self, kind, name, device='cpu', dtype=None, variant=None, export=None):
+        key = (kind, name, str(device), str(dtype) if dtype is not None else None, variant, export)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+
+            print(f"Loading {kind} model: {name} ({device}{', ' + variant if variant else ''}"
+                  f"{', ' + export if export else ''})...")
+            entry = self._load(kind, name, device, dtype, variant, export)
+            self.loads += 1
+            self._models[key] = entry
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return entry
+
+    @staticmethod
+    def _load(kind, name, device, dtype, variant, export):
+        def load():
+            return _optimize(kind, LOADERS[kind](name, device, _resolve_dtype(dtype)), variant)
+
+        if export is None:
+            return load()
+        from common.model_export import load_or_export
+
+        return load_or_export(kind, name, load, device=device, dtype=dtype, variant=variant, fmt=export)
+
+    def put(self, kind, name, entry, device='cpu', dtype=None, variant=None, export=None):
+        """
+        Registers an already-loaded model (or (model, tokenizer) pair).
+        """
+        key = (kind, name, str(device), str(dtype) if dtype is not None else None, variant, export)
+        with self._lock:
+            self._models[key] = entry
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+
+    def warm_up(self, specs):
+        """
+        Loads every (kind, name[, device[, dtype[, variant[, export]]]]) spec up front, so a long-running
+        worker pays the deserialization once before serving requests.
+        """
+        for spec in specs:
+            self.get(*spec)
+
+    def evict(self, kind=None, name=None):
+        with self._lock:
+            for key in list(self._models):
+                if (kind is None or key[0] == kind) and (name is None or key[1] == name):
+                    del self._models[key]
+
+    def __contains__(self, key):
+        return key in self._models
+
+    def __len__(self):
+        return len(self._models)
+
+
+REGISTRY = ModelRegistry()
+
+
+def get_model(kind, name, device='cpu', dtype=None, variant=None, export=None):
+    return REGISTRY.get(kind, name, device=device, dtype=dtype, variant=variant, export=export)
+
+
+def warm_up(specs):
+    REGISTRY.warm_up(specs)
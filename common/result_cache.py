@@ -0,0 +1,224 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from common.instrumentation import count
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "RESULT_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "voicerecognition_labs", "results.sqlite"))
+DEFAULT_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 4 * 1024 ** 3))
+DEFAULT_MAX_AGE_DAYS = float(os.environ.get("RESULT_CACHE_MAX_AGE_DAYS", 30))
+
+
+def _feed(h, obj):
+    # type-tagged, order-preserving encoding, so different inputs cannot collide by repr
+    if obj is None or isinstance(obj, (bool, int, float)):
+        h.update(f"{type(obj).__name__}:{obj!r};".encode('utf-8'))
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        h.update(f"str:{len(data)}:".encode('utf-8'))
+        h.update(data)
+    elif isinstance(obj, bytes):
+        h.update(f"bytes:{len(obj)}:".encode('utf-8'))
+        h.update(obj)
+    elif isinstance(obj, np.ndarray):
+        h.update(f"ndarray:{obj.dtype}:{obj.shape}:".encode('utf-8'))
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}:{len(obj)}:".encode('utf-8'))
+        for item in obj:
+            _feed(h, item)
+    elif isinstance(obj, dict):
+        h.update(f"dict:{len(obj)}:".encode('utf-8'))
+        for key in sorted(obj, key=repr):
+            _feed(h, key)
+            _feed(h, obj[key])
+    else:
+        raise TypeError(f"Cannot hash {type(obj).__name__} for a cache key")
+
+
+def make_key(namespace, *parts):
+    """
+    sha256 over the namespace and all key parts (texts, arrays, config values).
+    """
+    h = hashlib.sha256()
+    _feed(h, namespace)
+    _feed(h, parts)
+    return h.hexdigest()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    sha256 of the file content, so a re-exported file with the same samples still hits.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _feed_state(h, value, torch):
+    if isinstance(value, torch.Tensor):
+        value = value.detach().cpu()
+        if value.is_quantized:
+            # int8 weights of quantized models: integer values plus the dequantized ones (scales)
+            _feed(h, value.int_repr().contiguous().numpy())
+            value = value.dequantize()
+        _feed(h, value.contiguous().numpy())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _feed_state(h, item, torch)
+    else:
+        _feed(h, repr(value))
+
+
+# weak keys: fingerprinting a model must not keep it alive after the registry evicts it
+_fingerprints = weakref.WeakKeyDictionary()
+
+
+def _is_quantized(model):
+    # int8 copies from common.cpu_fast keep the hub config (and its commit hash) of the fp32 model
+    modules = getattr(model, "modules", None)
+    return modules is not None and any(type(m).__module__.startswith("torch.ao.nn.quantized") for m in modules())
+
+
+def model_fingerprint(model, name=None):
+    """
+    Model identity for cache keys: name + hub commit hash when transformers knows it
+    (+ '+int8' for dynamically quantized copies), otherwise a digest of the weights
+    (computed once per model object).
+    """
+    config = getattr(model, "config", None)
+    commit = getattr(config, "_commit_hash", None)
+    if commit:
+        return f"{name or getattr(config, '_name_or_path', '')}@{commit}{'+int8' if _is_quantized(model) else ''}"
+
+    import torch
+
+    if model not in _fingerprints:
+        h = hashlib.sha256()
+        for param_name, value in model.state_dict().items():
+            _feed(h, param_name)
+            _feed_state(h, value, torch)
+        _fingerprints[model] = h.hexdigest()
+    return f"{name or type(model).__name__}#{_fingerprints[model][:16]}"
+
+
+class ResultCache:
+    """
+    Content-addressed store for pickled results in one SQLite file.
+    Entries are keyed by make_key(namespace, inputs..., config...); entries older than
+    max_age_days are dropped and the least recently used ones are evicted once the
+    total size exceeds max_bytes. Hits and misses are counted per namespace.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # one connection per process (worker processes open their own)
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, namespace TEXT, value BLOB, size INTEGER, created REAL, used REAL)")
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _count(self, namespace, outcome):
+        stat = self.stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        stat[outcome] += 1
+        count(f"cache.{namespace}.{outcome}")
+
+    def get(self, namespace, key):
+        """
+        Returns (found, value).
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.max_age_days * 86400:
+                self._count(namespace, "misses")
+                return False, None
+            conn.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._count(namespace, "hits")
+        return True, pickle.loads(row[0])
+
+    def put(self, namespace, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, namespace, blob, len(blob), now, now))
+            conn.commit()
+            self._evict(conn)
+
+    def get_or_compute(self, namespace, key_parts, compute):
+        """
+        compute() on a miss, stored under make_key(namespace, *key_parts).
+        """
+        key = make_key(namespace, *key_parts)
+        found, value = self.get(namespace, key)
+        if not found:
+            value = compute()
+            self.put(namespace, key, value)
+        return value
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM results WHERE created < ?", (time.time() - self.max_age_days * 86400,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total > self.max_bytes:
+            for key, size in conn.execute("SELECT key, size FROM results ORDER BY used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+        conn.commit()
+
+    def clear(self, namespace=None):
+        with self._lock:
+            conn = self._connection()
+            if namespace is None:
+                conn.execute("DELETE FROM results")
+            else:
+                conn.execute("DELETE FROM results WHERE namespace = ?", (namespace,))
+            conn.commit()
+
+    def report(self):
+        """
+        Prints hit/miss statistics of this process and the stored entries per namespace.
+        """
+        with self._lock:
+            stored = dict(((ns, (n, size)) for ns, n, size in self._connection().execute(
+                "SELECT namespace, COUNT(*), SUM(size) FROM results GROUP BY namespace")))
+        print("\n--- Result cache ---")
+        for namespace in sorted(set(self.stats) | set(stored)):
+            stat = self.stats.get(namespace, {"hits": 0, "misses": 0})
+            lookups = stat["hits"] + stat["misses"]
+            rate = stat["hits"] / lookups if lookups else 0.0
+            entries, size = stored.get(namespace, (0, 0))
+            print(f"{namespace:<20} hits={stat['hits']:<6} misses={stat['misses']:<6} hit rate={rate:.1%} "
+                  f"| stored: {entries} entries, {size / 1024 ** 2:.1f} MiB")
+        return self.stats
+
+
+RESULT_CACHE = ResultCache()
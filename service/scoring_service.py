@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "task2_src"))
+sys.path.append(os.path.join(ROOT, "task4"))
+
+PUNCT_MODEL_NAME = "ukr-models/uk-punctcase"
+MAX_BODY_BYTES = 16 * 1024 ** 2
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into batches: a batch is closed once it has max_batch_size
+    items or max_wait seconds passed since its first item. Every batch is processed by
+    process(items) -> results in a dedicated worker thread, so the event loop never blocks
+    on inference. If a batch raises, its items are retried one at a time, so an error only
+    fails the request that caused it. Keeps queue depth, batch size and latency statistics.
+    """
+
+    def __init__(self, name, process, max_batch_size=16, max_wait=0.01, history=1000):
+        self.name = name
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-worker")
+        self.latencies = deque(maxlen=history)
+        self.batch_sizes = deque(maxlen=history)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # whatever arrived meanwhile also fits, no need to wait for it
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _, _ in batch]
+            self.in_flight = len(batch)
+            try:
+                results = await loop.run_in_executor(self.executor, self.process, items)
+            except Exception:
+                # one bad item must not fail the requests it was batched with: retry them one by one
+                results = await loop.run_in_executor(self.executor, self._process_each, items)
+            finally:
+                self.in_flight = 0
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, _Failed):
+                    self.errors += 1
+                    future.set_exception(result.error)
+                else:
+                    future.set_result(result)
+
+            now = time.perf_counter()
+            self.latencies.extend(now - submitted for _, _, submitted in batch)
+            self.batch_sizes.append(len(batch))
+            self.requests += len(batch)
+            self.batches += 1
+
+    def _process_each(self, items):
+        results = []
+        for item in items:
+            try:
+                results.extend(self.process([item]))
+            except Exception as e:
+                results.append(_Failed(e))
+        return results
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+
+        return {
+            "queue_depth": self.queue.qsize(),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch_size": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0,
+            "latency_ms": {"p50": percentile(0.5), "p90": percentile(0.9), "p99": percentile(0.99)},
+        }
+
+
+def make_punctuation_processor(model, tokenizer, device='cpu', window=None, batch_size=32):
+    """
+    items: texts -> {"text": restored text, "words": [...], "tags": [...]}
+    All texts of a micro-batch go through one get_word_predictions_batched call.
+    """
+    from uk_puntcase.get_predictions import apply_predictions, get_word_predictions_batched
+
+    def process(texts):
+        words, tags = get_word_predictions_batched(model, tokenizer, texts, device=device,
+                                                   batch_size=batch_size, window=window)
+        return [{"text": apply_predictions(w, t), "words": w, "tags": t} for w, t in zip(words, tags)]
+    return process
+
+
+def process_wer(items):
+    """
+    items: {"reference", "hypothesis", "mode": 'word'|'char', "normalize": bool} -> metrics counts
+    """
+    from normalization import normalize_many
+    from task_2 import calculate_metrics
+
+    refs = [item["reference"] for item in items]
+    hyps = [item["hypothesis"] for item in items]
+    refs_clean, hyps_clean = normalize_many(refs), normalize_many(hyps)
+    results = []
+    for item, ref, hyp, ref_clean, hyp_clean in zip(items, refs, hyps, refs_clean, hyps_clean):
+        if not item.get("normalize", True):
+            ref_clean, hyp_clean = ref, hyp
+        result = calculate_metrics(ref_clean, hyp_clean, mode=item.get("mode", "word"), counts_only=True)
+        del result["Alignment"]
+        results.append(result)
+    return results
+
+
+class ScoringService:
+    """
+    Local HTTP/1.1 JSON service (TCP or Unix socket) that keeps the models resident:
+    POST /punctuation  {"text": "..."}                           -> {"text", "words", "tags"}
+    POST /wer          {"reference", "hypothesis", "mode"?, "normalize"?} -> {"WER/CER", "S", "I", "D", "N"}
+    GET  /metrics      queue depth, batch sizes and latency percentiles per endpoint
+    GET  /health
+    """
+
+    def __init__(self, punct_process=None, max_batch_size=16, max_wait=0.01):
+        self.batchers = {"wer": MicroBatcher("wer", process_wer, max_batch_size, max_wait)}
+        if punct_process is not None:
+            self.batchers["punctuation"] = MicroBatcher("punctuation", punct_process, max_batch_size, max_wait)
+        self.started = time.time()
+
+    async def start(self):
+        for batcher in self.batchers.values():
+            batcher.start()
+
+    async def stop(self):
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    def metrics(self):
+        return {"uptime_s": time.time() - self.started,
+                **{name: batcher.stats() for name, batcher in self.batchers.items()}}
+
+    async def dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+
+        name = path.strip("/")
+        if method != "POST" or name not in self.batchers:
+            return 404, {"error": f"Unknown endpoint: {method} {path}"}
+        try:
+            payload = json.loads(body or b"{}")
+            if name == "punctuation":
+                item = payload["text"]
+                if not isinstance(item, str):
+                    raise ValueError("'text' must be a string")
+            else:
+                item = payload
+                if not isinstance(item.get("reference"), str) or not isinstance(item.get("hypothesis"), str):
+                    raise ValueError("'reference' and 'hypothesis' must be strings")
+                if item.get("mode", "word") not in ("word", "char"):
+                    raise ValueError("'mode' must be 'word' or 'char'")
+        except (ValueError, KeyError, AttributeError) as e:
+            return 400, {"error": f"Bad request: {e}"}
+
+        try:
+            return 200, await self.batchers[name].submit(item)
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode('latin-1').partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    status, response = 413, {"error": "Request body too large"}
+                    body = None
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, response = await self.dispatch(method, path.split("?", 1)[0], body)
+
+                data = json.dumps(response, ensure_ascii=False).encode('utf-8')
+                keep_alive = headers.get("connection", "").lower() != "close" and body is not None
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+async def serve(service, host="127.0.0.1", port=8765, unix_socket=None, ready=None):
+    """
+    Runs the service until cancelled. ready -> optional asyncio.Event set once listening.
+    """
+    await service.start()
+    if unix_socket:
+        server = await asyncio.start_unix_server(service.handle, path=unix_socket)
+        print(f"Listening on unix:{unix_socket}")
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"Listening on http://{host}:{server.sockets[0].getsockname()[1]}")
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching punctuation restoration and WER service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--model", default=PUNCT_MODEL_NAME, help="hub name or local path of the punctuation model")
+    parser.add_argument("--no-punctuation", action="store_true", help="serve /wer only, no model is loaded")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--cpu-fast", action="store_true", help="int8 dynamically quantized punctuation model")
+    parser.add_argument("--export", choices=["torchscript", "onnx"],
+                        help="load the model from an exported artifact, exporting it on the first run")
+    parser.add_argument("--window", type=int, help="sliding window (tokens) for long unpunctuated input")
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    punct_process = None
+    if not args.no_punctuation:
+        from common.model_registry import get_model
+
+        model, tokenizer = get_model("token-classification", args.model, device=args.device,
+                                     variant="cpu-fast" if args.cpu_fast else None, export=args.export)
+        punct_process = make_punctuation_processor(model, tokenizer, device=args.device, window=args.window)
+
+    service = ScoringService(punct_process, max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from normalization import normalize_many
+from task_2 import calculate_metrics
+
+
+def read_manifest(path):
+    """
+    Reads (utt_id, reference, hypothesis) triples.
+    .jsonl -> one object per line with 'utt_id', 'reference', 'hypothesis' keys
+    anything else -> tab-separated 'utt_id<TAB>reference<TAB>hypothesis' lines
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield row['utt_id'], row['reference'], row['hypothesis']
+        else:
+            for line in f:
+                line = line.rstrip('\n')
+                if line:
+                    utt_id, reference, hypothesis = line.split('\t', 2)
+                    yield utt_id, reference, hypothesis
+
+
+def _score_chunk(chunk):
+    # runs inside a worker process; alignments are not needed, so skip the backtrace
+    rows = []
+    refs_clean = normalize_many([reference for _, reference, _ in chunk])
+    hyps_clean = normalize_many([hypothesis for _, _, hypothesis in chunk])
+    for (utt_id, _, _), ref_clean, hyp_clean in zip(chunk, refs_clean, hyps_clean):
+        row = {"utt_id": utt_id}
+        for mode, name in (('word', 'WER'), ('char', 'CER')):
+            result = calculate_metrics(ref_clean, hyp_clean, mode=mode, counts_only=True)
+            row[name] = result['WER/CER']
+            row[f"{name}_S"] = result['S']
+            row[f"{name}_I"] = result['I']
+            row[f"{name}_D"] = result['D']
+            row[f"{name}_N"] = result['N']
+        rows.append(row)
+    return rows
+
+
+def _chunks(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def corpus_totals(rows):
+    """
+    Micro-averaged corpus WER/CER: (sum S + sum D + sum I) / sum N.
+    """
+    totals = {}
+    for name in ('WER', 'CER'):
+        S = sum(r[f"{name}_S"] for r in rows)
+        I = sum(r[f"{name}_I"] for r in rows)
+        D = sum(r[f"{name}_D"] for r in rows)
+        N = sum(r[f"{name}_N"] for r in rows)
+        totals[name] = {
+            "error_rate": (S + D + I) / N if N > 0 else -1.0,
+            "S": S, "I": I, "D": D, "N": N,
+        }
+    return totals
+
+
+def score_corpus(utterances, workers=None, chunk_size=64):
+    """
+    Scores an iterable of (utt_id, reference, hypothesis) across a process pool.
+    Utterances are submitted in chunks to keep the IPC overhead per utterance small.
+    Returns (per-utterance rows in input order, corpus totals).
+    """
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # executor.map keeps submission order, so rows come back in manifest order
+        for chunk_rows in executor.map(_score_chunk, _chunks(utterances, chunk_size)):
+            rows.extend(chunk_rows)
+    return rows, corpus_totals(rows)
+
+
+def write_rows_csv(rows, file):
+    """
+    Saves per-utterance rows to a CSV file.
+    """
+    fields = ["utt_id"]
+    for name in ('WER', 'CER'):
+        fields += [name, f"{name}_S", f"{name}_I", f"{name}_D", f"{name}_N"]
+
+    with open(file, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corpus-scale WER/CER scoring.")
+    parser.add_argument("manifest", help="TSV (utt_id, reference, hypothesis) or .jsonl manifest")
+    parser.add_argument("-o", "--output", default="batch_scores.csv", help="per-utterance CSV")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=64)
+    args = parser.parse_args()
+
+    rows, totals = score_corpus(read_manifest(args.manifest), workers=args.workers, chunk_size=args.chunk_size)
+    write_rows_csv(rows, args.output)
+
+    print(f"Utterances scored: {len(rows)}")
+    for name, t in totals.items():
+        print(f"Corpus {name}: {t['error_rate']:.2%} (S={t['S']} I={t['I']} D={t['D']} N={t['N']})")
+    print(f"Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
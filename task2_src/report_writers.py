@@ -0,0 +1,182 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+_BUFFER_SIZE = 1 << 16
+
+
+def alignment_rows(result):
+    """
+    Streams (reference, hypothesis, type) rows of an alignment in a single pass.
+    """
+    for ref, hyp, error_type in result['Alignment']:
+        #show '*' for OK, or the actual hypothesis
+        hyp_display = hyp if hyp != "*" else "*"
+        yield ref, hyp_display, error_type
+
+
+class ReportWriter(ABC):
+    """
+    Base sink: owns one open buffered handle for the whole report.
+    Subclasses implement write_summary / write_row.
+    """
+    newline = None
+
+    def __init__(self, file):
+        self.file = file
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.file, mode='w', encoding='utf-8', newline=self.newline, buffering=_BUFFER_SIZE)
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    def write_summary(self, title, result):
+        pass
+
+    @abstractmethod
+    def write_row(self, ref, hyp, error_type):
+        pass
+
+    def write_report(self, title, result):
+        self.write_summary(title, result)
+        for row in alignment_rows(result):
+            self.write_row(*row)
+
+
+class TextReportWriter(ReportWriter):
+    """
+    Human-readable table, same layout as the original task_2 report.
+    echo=True also prints every line to stdout.
+    """
+
+    def __init__(self, file, echo=True):
+        super().__init__(file)
+        self.echo = echo
+
+    def line(self, msg):
+        if self.echo:
+            print(msg)
+        self.f.write(f"{msg}\n")
+
+    def write_summary(self, title, result):
+        self.line(f"\n--- {title} ---")
+        self.line(f"S (Substitutions): {result['S']}")
+        self.line(f"I (Insertions): {result['I']}")
+        self.line(f"D (Deletions): {result['D']}")
+        self.line(f"N (Total tokens in reference): {result['N']}")
+        self.line(f"**Error Rate: {result['WER/CER']:.2%}**")
+
+        self.line("\nAlignment Table:")
+        self.line(f"{'REFERENCE':<20} | {'HYPOTHESIS':<20} | {'TYPE':<5}")
+        self.line("-" * 50)
+
+    def write_row(self, ref, hyp, error_type):
+        self.line(f"{str(ref):<20} | {str(hyp):<20} | {error_type}")
+
+
+class CsvReportWriter(ReportWriter):
+    """
+    Alignment table only. Columns: Reference, Hypothesis, Type
+    """
+    newline = ''
+
+    def __enter__(self):
+        super().__enter__()
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(['Reference', 'Hypothesis', 'Type'])
+        return self
+
+    def write_row(self, ref, hyp, error_type):
+        self.writer.writerow([ref, hyp, error_type])
+
+
+class JsonlReportWriter(ReportWriter):
+    """
+    First line holds the summary, every following line is one alignment row.
+    """
+
+    def write_summary(self, title, result):
+        summary = {k: result[k] for k in ("WER/CER", "S", "I", "D", "N")}
+        summary["title"] = title
+        self.f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+    def write_row(self, ref, hyp, error_type):
+        self.f.write(json.dumps({"ref": ref, "hyp": hyp, "type": error_type}, ensure_ascii=False) + "\n")
+
+
+class ColumnarReportWriter(ReportWriter):
+    """
+    Compressed columnar output.
+    *.parquet -> written with pyarrow (optional dependency)
+    anything else -> numpy .npz (np.savez_compressed)
+    Rows are collected into columns and written on close; nothing is written
+    if the with block raised, so a failed report leaves no partial file.
+    """
+    columns = None
+
+    def __enter__(self):
+        self.columns = {"ref": [], "hyp": [], "type": []}
+        self.summary = {}
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.columns = None
+        self.close()
+
+    def write_summary(self, title, result):
+        self.summary = {k: result[k] for k in ("WER/CER", "S", "I", "D", "N")}
+        self.summary["title"] = title
+
+    def write_row(self, ref, hyp, error_type):
+        self.columns["ref"].append(ref)
+        self.columns["hyp"].append(hyp)
+        self.columns["type"].append(error_type)
+
+    def close(self):
+        if self.columns is None:
+            return
+        if str(self.file).endswith('.parquet'):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Parquet output requires 'pyarrow'. Use a .npz file instead.")
+            table = pa.table(self.columns)
+            table = table.replace_schema_metadata({"summary": json.dumps(self.summary, ensure_ascii=False)})
+            pq.write_table(table, self.file, compression="zstd")
+        else:
+            np.savez_compressed(
+                self.file,
+                ref=np.array(self.columns["ref"], dtype=str),
+                hyp=np.array(self.columns["hyp"], dtype=str),
+                type=np.array(self.columns["type"], dtype=str),
+                summary=np.array(json.dumps(self.summary, ensure_ascii=False)),
+            )
+        self.columns = None
+
+
+WRITERS = {
+    "text": TextReportWriter,
+    "csv": CsvReportWriter,
+    "jsonl": JsonlReportWriter,
+    "columnar": ColumnarReportWriter,
+}
+
+
+def write_report(title, result, file, kind="text", **kwargs):
+    """
+    Writes a full report (summary + alignment) with one of the WRITERS sinks.
+    """
+    with WRITERS[kind](file, **kwargs) as writer:
+        writer.write_report(title, result)
@@ -0,0 +1,145 @@
+import numpy as np
+
+_INF = np.iinfo(np.int64).max // 4
+
+
+class StreamingScorer:
+    """
+    Incremental WER/CER for a hypothesis that grows word by word (live captioning).
+
+    The reference is given once; every appended hypothesis token adds one DP row over
+    the reference, computed with a few NumPy vector operations from the previous row,
+    so an update costs O(len(ref)) (or O(band)) instead of re-scoring the whole text.
+    Only the current row and the row before the last word are kept, which is enough
+    to replace the last (partial) word.
+
+    Ties are broken like levenshtein() (match/substitution, then deletion, then insertion),
+    so result() equals calculate_metrics(reference, ' '.join(words), mode) counts.
+
+    mode='word' -> WER, every appended word is one token
+    mode='char' -> CER, every word adds its characters ('_' between words, as in calculate_metrics)
+    band        -> optional half-width of a diagonal band; only the band of each row is
+                   computed and kept. Exact while the optimal path stays inside it.
+                   Reference tokens beyond the band count as deletions, so result()
+                   mid-session scores the rest of the reference as not spoken yet;
+                   hypothesis tokens past the end of the reference count as insertions.
+    """
+
+    def __init__(self, reference, mode='word', band=None):
+        if mode == 'word':
+            ref_tokens = reference.split()
+        else: # mode == 'char'
+            ref_tokens = list(reference.replace(' ', '_'))
+        self.mode = mode
+        self.band = band
+        self._index = {}
+        for tok in ref_tokens:
+            self._index.setdefault(tok, len(self._index))
+        self.ref_ids = np.fromiter((self._index[t] for t in ref_tokens), dtype=np.int64, count=len(ref_tokens))
+        self.words = []
+
+        lo, hi = self._limits(0)
+        cols = np.arange(lo, hi + 1, dtype=np.int64)
+        # (hyp tokens consumed, first reference position kept, cost, S, D) over the band only,
+        # I = cost - S - D
+        self._row = (0, lo, cols, np.zeros(len(cols), dtype=np.int64), cols.copy())
+        self._before_last = None
+
+    def _tokens(self, word):
+        if self.mode == 'word':
+            return [word]
+        return (['_'] if self.words else []) + list(word)
+
+    def _limits(self, j):
+        n = len(self.ref_ids)
+        if self.band is None:
+            return 0, n
+        # once the hypothesis runs past the end of the reference plus the band, the band is
+        # clamped to the last reference position, so the extra tokens count as insertions
+        return min(max(0, j - self.band), n), min(n, j + self.band)
+
+    @staticmethod
+    def _window(row, a, b):
+        # cost, S, D of reference positions a..b, unreachable outside the stored band
+        _, lo, cost, S, D = row
+        out_cost = np.full(b - a + 1, _INF, dtype=np.int64)
+        out_S = np.zeros(b - a + 1, dtype=np.int64)
+        out_D = np.zeros(b - a + 1, dtype=np.int64)
+        start, stop = max(a, lo), min(b, lo + len(cost) - 1)
+        if start <= stop:
+            out_cost[start - a:stop - a + 1] = cost[start - lo:stop - lo + 1]
+            out_S[start - a:stop - a + 1] = S[start - lo:stop - lo + 1]
+            out_D[start - a:stop - a + 1] = D[start - lo:stop - lo + 1]
+        return out_cost, out_S, out_D
+
+    def _step(self, row, tok):
+        j = row[0] + 1
+        lo, hi = self._limits(j)
+        tok_id = self._index.get(tok, -1)
+        idx = np.arange(lo, hi + 1, dtype=np.int64)
+        # previous row at positions lo-1..hi: [:-1] feeds the diagonal, [1:] the cell above
+        cost, S, D = self._window(row, lo - 1, hi)
+
+        # insertion: consume the hypothesis token only
+        up = cost[1:] + 1
+        # match / substitution
+        start = max(lo, 1)
+        sub = np.zeros(len(idx), dtype=np.int64)
+        sub[start - lo:] = self.ref_ids[start - 1:hi] != tok_id
+        diag = cost[:-1] + sub
+        # deletion (consume a reference token only) chains along the row: running minimum
+        best = np.minimum.accumulate(np.minimum(diag, up) - idx) + idx
+
+        is_diag = diag == best
+        is_left = np.zeros(len(idx), dtype=bool)
+        is_left[1:] = ~is_diag[1:] & (best[:-1] + 1 == best[1:])
+
+        base_S = np.where(is_diag, S[:-1] + sub, S[1:])
+        base_D = np.where(is_diag, D[:-1], D[1:])
+        # a run of deletions copies the counts of the last non-deletion cell
+        last = np.maximum.accumulate(np.where(is_left, 0, np.arange(len(idx))))
+        return (j, lo, best, base_S[last], base_D[last] + (np.arange(len(idx)) - last))
+
+    def append(self, word):
+        """
+        Adds the next hypothesis word.
+        """
+        self._before_last = self._row
+        row = self._row
+        for tok in self._tokens(word):
+            row = self._step(row, tok)
+        self._row = row
+        self.words.append(word)
+
+    def extend(self, words):
+        for word in words:
+            self.append(word)
+
+    def replace_last(self, word):
+        """
+        Replaces the last word (a partial result revised by the recognizer).
+        """
+        if self._before_last is None:
+            raise ValueError("Only the last appended word can be replaced")
+        self._row = self._before_last
+        self.words.pop()
+        self.append(word)
+
+    def result(self):
+        """
+        Same dict as calculate_metrics(..., counts_only=True) for the hypothesis so far.
+        """
+        _, lo, cost, S, D = self._row
+        N = len(self.ref_ids)
+        # last cell of the row inside the band, the remaining reference tokens are deletions
+        hi = lo + len(cost) - 1
+        distance = int(cost[-1]) + N - hi
+        S, D = int(S[-1]), int(D[-1]) + N - hi
+        return {
+            "WER/CER": distance / N if N > 0 else -1.0,
+            "S": S,
+            "I": distance - S - D,
+            "D": D,
+            "N": N,
+            "Alignment": None
+        }
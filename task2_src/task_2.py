@@ -1,105 +1,76 @@
-import difflib
-import unicodedata
-import string
-import csv
+import os
+import sys
 
-def printshare(msg,  logfile, mode="a"):
-    print(msg)
+import numpy as np
 
-    with open(logfile, mode=mode, encoding='utf-8') as f:
-        print(msg, file=f)
+from normalization import normalize
+from report_writers import TextReportWriter, CsvReportWriter
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.alignment import Alignment
+from common.levenshtein import encode_tokens, levenshtein
+from common.instrumentation import count, timed, timer
+from common.result_cache import RESULT_CACHE
 
-def clean_text(text):
+# bump when the scoring changes, so cached results of older code are not reused
+METRICS_CACHE_VERSION = 1
+
+@timed("metrics.clean_text")
+def clean_text(text, normalizer=None):
     """
     1. Converts text to lowercase.
     2. Replaces non-breaking spaces and other whitespaces with a regular space.
-    3. Removes punctuation using unicodedata.
+    3. Removes punctuation (all Unicode 'P*' categories).
+    Uses a precompiled translation table, see normalization.Normalizer for other profiles.
     """
-    if not text:
-        return ""
-    
-    # 1. 
-    text = text.lower()
-    
-    # 2.
-    text = " ".join(text.split())
-
-    # 3. 
-    cleaned_chars = []
-    for char in text:
-        if not unicodedata.category(char).startswith('P'):
-            cleaned_chars.append(char)
-        else:
-            cleaned_chars.append(' ')
-            
-    text = "".join(cleaned_chars)
-    
-    # ensuring space absence for safety
-    return " ".join(text.split())
+    return normalize(text, normalizer)
 
-def calculate_metrics(reference, hypothesis, mode='word'):
+def _ids_at(ids, pos):
+    # token ids along the alignment path, -1 where the other side has no token
+    out = np.full(len(pos), -1, dtype=np.int64)
+    out[pos >= 0] = ids[pos[pos >= 0]]
+    return out
+
+def calculate_metrics(reference, hypothesis, mode='word', counts_only=False, cache=False):
     """
-    Compares two texts and calculates S, I, D.
+    Compares two texts and calculates S, I, D with a minimum edit-distance alignment.
     mode='word' -> WER (Word Error Rate)
     mode='char' -> CER (Character Error Rate)
+    counts_only -> skip the backtrace, 'Alignment' is returned as None
+    cache       -> look the result up in the shared result cache (keyed by the normalized
+                   texts and the options), compute and store it on a miss
     """
+    if cache:
+        return RESULT_CACHE.get_or_compute(
+            "metrics", (METRICS_CACHE_VERSION, reference, hypothesis, mode, counts_only),
+            lambda: calculate_metrics(reference, hypothesis, mode=mode, counts_only=counts_only))
     
-    if mode == 'word':
-        ref_tokens = reference.split()
-        hyp_tokens = hypothesis.split()
-    else: # mode == 'char'
-        # CER => replace spaces with underscores for stability
-        ref_tokens = list(reference.replace(' ', '_'))
-        hyp_tokens = list(hypothesis.replace(' ', '_'))
-
-    # difflib to find differences. autojunk disabled bcs CER suffer otherwise.
-    matcher = difflib.SequenceMatcher(None, ref_tokens, hyp_tokens, autojunk=False)
-    
-    S, I, D, C = 0, 0, 0, 0
-    alignment_table = []
-
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        ref_segment = ref_tokens[i1:i2]
-        hyp_segment = hyp_tokens[j1:j2]
-        
-        if tag == 'equal':
-            # Correct matches
-            for r, h in zip(ref_segment, hyp_segment):
-                alignment_table.append((r, "*", "OK"))
-                C += 1
-                
-        elif tag == 'replace':
-            # Substitution
-            len_ref = len(ref_segment)
-            len_hyp = len(hyp_segment)
-            min_len = min(len_ref, len_hyp)
-
-            for k in range(min_len):
-                alignment_table.append((ref_segment[k], hyp_segment[k], "S"))
-                S += 1
-            
-            # lengths differ => record the rest as Deletions or Insertions
-            if len_ref > len_hyp:
-                for k in range(min_len, len_ref):
-                    alignment_table.append((ref_segment[k], '""', "D"))
-                    D += 1
-            elif len_hyp > len_ref:
-                for k in range(min_len, len_hyp):
-                    alignment_table.append(('""', hyp_segment[k], "I"))
-                    I += 1
-
-        elif tag == 'delete':
-            # Deletion
-            for word in ref_segment:
-                alignment_table.append((word, '""', "D"))
-                D += 1
-                
-        elif tag == 'insert':
-            # Insertion
-            for word in hyp_segment:
-                alignment_table.append(('""', word, "I"))
-                I += 1
+    with timer("metrics.tokenize"):
+        if mode == 'word':
+            ref_tokens = reference.split()
+            hyp_tokens = hypothesis.split()
+        else: # mode == 'char'
+            # CER => replace spaces with underscores for stability
+            ref_tokens = list(reference.replace(' ', '_'))
+            hyp_tokens = list(hypothesis.replace(' ', '_'))
+        ref_ids, hyp_ids, vocab = encode_tokens(ref_tokens, hyp_tokens)
+    count(f"metrics.{mode}.ref_tokens", len(ref_tokens))
+    count(f"metrics.{mode}.hyp_tokens", len(hyp_tokens))
+
+    with timer("metrics.levenshtein"):
+        lev = levenshtein(ref_ids, hyp_ids, backtrace=not counts_only)
+    S, I, D = lev["S"], lev["I"], lev["D"]
+
+    alignment_table = None
+    if not counts_only:
+        with timer("metrics.alignment"):
+            ref_pos, hyp_pos, edits = lev["path"]
+            alignment_table = Alignment(
+                vocab,
+                _ids_at(ref_ids, ref_pos),
+                _ids_at(hyp_ids, hyp_pos),
+                edits,
+            )
 
     N = len(ref_tokens)
     error_rate = (S + D + I) / N if N > 0 else -1.0
@@ -114,35 +85,16 @@ def calculate_metrics(reference, hypothesis, mode='word'):
     }
 
 def print_results(title, result, file):
-    printshare(f"\n--- {title} ---", file, mode="w")
-    printshare(f"S (Substitutions): {result['S']}", file)
-    printshare(f"I (Insertions): {result['I']}", file)
-    printshare(f"D (Deletions): {result['D']}", file)
-    printshare(f"N (Total tokens in reference): {result['N']}", file)
-    printshare(f"**Error Rate: {result['WER/CER']:.2%}**", file)
-    
-    printshare("\nAlignment Table:", file)
-    printshare(f"{'REFERENCE':<20} | {'HYPOTHESIS':<20} | {'TYPE':<5}", file)
-    printshare("-" * 50, file)
-    for ref, hyp, error_type in result['Alignment']:
-        #show '*' for OK, or the actual hypothesis
-        hyp_display = hyp if hyp != "*" else "*"     
-        printshare(f"{str(ref):<20} | {str(hyp_display):<20} | {error_type}", file)
+    with timer("metrics.report"), TextReportWriter(file) as writer:
+        writer.write_report(title, result)
 
 def print_results_csv(result, file):
     """
     Saves the alignment table to a CSV file without decorative headers.
     Columns: Reference, Hypothesis, Type
     """
-    with open(file, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        
-        writer.writerow(['Reference', 'Hypothesis', 'Type'])
-        
-        for ref, hyp, error_type in result['Alignment']:
-            # show '*' for OK, or the actual hypothesis
-            hyp_display = hyp if hyp != "*" else "*"
-            writer.writerow([ref, hyp_display, error_type])
+    with timer("metrics.report"), CsvReportWriter(file) as writer:
+        writer.write_report(None, result)
 
 if __name__ == "__main__":
     reference_raw = """І раптом літо, згадавши, як добре йому було, прокидається з невчасно
@@ -200,10 +152,12 @@ if __name__ == "__main__":
     print(f"\nclean ref: '{ref_clean}'")
     print(f"clean hyp: '{hyp_clean}'")
 
-    wer_result = calculate_metrics(ref_clean, hyp_clean, mode='word')
+    wer_result = calculate_metrics(ref_clean, hyp_clean, mode='word', cache=True)
     print_results("Wav2Vec2 WER", wer_result, file="wav2vec2_vika_visual_wer.txt")
     print_results_csv(wer_result, file="wav2vec2_vika_wer.csv")
 
-    cer_result = calculate_metrics(ref_clean, hyp_clean, mode='char')
+    cer_result = calculate_metrics(ref_clean, hyp_clean, mode='char', cache=True)
     print_results("Wav2Vec2 CER", cer_result, file="wav2vec2_vika_visual_cer.txt")
-    print_results_csv(cer_result, file="wav2vec2_vika_cer.csv")
\ No newline at end of file
+    print_results_csv(cer_result, file="wav2vec2_vika_cer.csv")
+
+    RESULT_CACHE.report()
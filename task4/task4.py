@@ -1,53 +1,218 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification
+import copy
+import os
+import sys
+import time
+import numpy as np
 import tokenize_uk
-from uk_puntcase.get_predictions import get_word_predictions, recover_text
 
-def extract_etalon_tags(etalon_text):
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from common.alignment import OK, SUB, DEL, INS
+from common.instrumentation import count, timer
+from common.levenshtein import encode_tokens, levenshtein
+from common.model_registry import get_model
+from common.result_cache import RESULT_CACHE
+from uk_puntcase.get_predictions import get_word_predictions_batched, recover_text
+
+MODEL_NAME = "ukr-models/uk-punctcase"
+PUNCT_CLASSES = ['O', ',', '.', '?', '!']
+# window size meaning "the model limit" (tokenizer.model_max_length minus [CLS]/[SEP])
+MODEL_WINDOW = "model"
+_CLASS_INDEX = {tag: i for i, tag in enumerate(PUNCT_CLASSES)}
+
+def extract_etalon_words_and_tags(etalon_text):
     """
-    Extracts punctuation tags from the ground truth (etalon) text.
+    Splits the ground truth (etalon) text into words and the punctuation tag of every word.
     Uses 'tokenize_uk' to ensure the token splitting exactly matches 
     how the model processes the recognized text.
     """
     tokens = tokenize_uk.tokenize_words(etalon_text)
+    words = []
     tags = []
     
     for i in range(len(tokens)):
         # If the token is a word (not one of the allowed punctuations)
         if tokens[i] not in ['.', ',', '?', '!']:
+            words.append(tokens[i])
             # Check if the next token is a punctuation mark
             if i + 1 < len(tokens) and tokens[i+1] in ['.', ',', '?', '!']:
                 tags.append(tokens[i+1])
             else:
                 tags.append('O') # 'O' means no punctuation
-    return tags
+    return words, tags
 
-def evaluate_punctuation(base_to_recognize, etalon_text):
-    print("Loading 'ukr-models/uk-punctcase' model and tokenizer...")
-    model_name = "ukr-models/uk-punctcase"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForTokenClassification.from_pretrained(model_name)
-    
-    device = 'cuda' if torch.cuda.is_available() else 'cpu'
-    model.to(device)
+def extract_etalon_tags(etalon_text):
+    """
+    Extracts punctuation tags from the ground truth (etalon) text.
+    """
+    return extract_etalon_words_and_tags(etalon_text)[1]
+
+def align_tags(etalon_words, etalon_tags, pred_words, pred_tags):
+    """
+    Pairs etalon and predicted tags through a minimum edit-distance alignment of the
+    (lowercased) word sequences, so one missing or extra recognized word does not shift
+    every tag after it.
+    matched / substituted words -> (etalon tag, predicted tag)
+    deleted words (not recognized) -> (etalon tag, 'O'): punctuation there is a miss
+    inserted words (not in etalon) -> ('O', predicted tag): punctuation there is a false alarm
+    Returns (true_tags, pred_tags, op counts array indexed by OK/SUB/DEL/INS).
+    """
+    ref_ids, hyp_ids, _ = encode_tokens([w.lower() for w in etalon_words], [w.lower() for w in pred_words])
+    ref_pos, hyp_pos, edits = levenshtein(ref_ids, hyp_ids)["path"]
+
+    true_aligned = []
+    pred_aligned = []
+    for i, j in zip(ref_pos.tolist(), hyp_pos.tolist()):
+        true_aligned.append(etalon_tags[i] if i >= 0 else 'O')
+        pred_aligned.append(pred_tags[j] if j >= 0 else 'O')
+    return true_aligned, pred_aligned, np.bincount(edits, minlength=4)
+
+def _rates(tp, fp, fn):
+    precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
+    recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
+    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+def punctuation_report(true_tags, pred_tags):
+    """
+    Confusion matrix over PUNCT_CLASSES (rows -> etalon, columns -> prediction) built with
+    one np.bincount, plus per-class and micro/macro precision, recall and F1 over the
+    punctuation classes ('O' is the negative class). Tags outside PUNCT_CLASSES count as 'O'.
+    """
+    k = len(PUNCT_CLASSES)
+    true_idx = np.fromiter((_CLASS_INDEX.get(t, 0) for t in true_tags), dtype=np.int64, count=len(true_tags))
+    pred_idx = np.fromiter((_CLASS_INDEX.get(t, 0) for t in pred_tags), dtype=np.int64, count=len(pred_tags))
+    confusion = np.bincount(true_idx * k + pred_idx, minlength=k * k).reshape(k, k)
+
+    tp = np.diag(confusion)[1:]
+    fp = confusion[:, 1:].sum(axis=0) - tp
+    fn = confusion[1:, :].sum(axis=1) - tp
+
+    per_class = {}
+    for c, tag in enumerate(PUNCT_CLASSES[1:]):
+        per_class[tag] = {**_rates(int(tp[c]), int(fp[c]), int(fn[c])), "support": int(confusion[c + 1].sum())}
+    micro = _rates(int(tp.sum()), int(fp.sum()), int(fn.sum()))
+    # macro average over the classes that occur in the etalon or the predictions
+    present = [tag for c, tag in enumerate(PUNCT_CLASSES[1:]) if confusion[c + 1].sum() or confusion[:, c + 1].sum()]
+    macro = {name: float(np.mean([per_class[tag][name] for tag in present])) if present else 0.0
+             for name in ("precision", "recall", "f1")}
+    return {"classes": PUNCT_CLASSES, "confusion": confusion, "per_class": per_class, "micro": micro, "macro": macro}
+
+def print_punctuation_report(report):
+    print("\n--- Confusion Matrix (rows: etalon, columns: predicted) ---")
+    print("     " + "".join(f"{tag:>8}" for tag in report["classes"]))
+    for tag, row in zip(report["classes"], report["confusion"]):
+        print(f"{tag:>5}" + "".join(f"{value:>8}" for value in row))
+
+    print("\n--- Per-class Metrics ---")
+    for tag, stats in report["per_class"].items():
+        print(f"'{tag}'  Precision: {stats['precision']:.4f} | Recall: {stats['recall']:.4f} | "
+              f"F1: {stats['f1']:.4f} | Support: {stats['support']}")
+    for name in ("micro", "macro"):
+        stats = report[name]
+        print(f"{name.capitalize()}  Precision: {stats['precision']:.4f} | Recall: {stats['recall']:.4f} | F1: {stats['f1']:.4f}")
+
+def evaluate_punctuation_corpus(documents, window=None, stride=None, batch_size=32,
+                                model=None, tokenizer=None, model_name=MODEL_NAME, device=None, verbose=True, cache=False,
+                                variant=None, export=None):
+    """
+    Corpus-level punctuation evaluation:
+    1. runs the model once over the sentences of all (recognized, etalon) documents
+       in padded batches, with sliding windows so every recognized word gets a tag,
+    2. aligns etalon and recognized words of every document (see align_tags),
+    3. scores all aligned tags together (see punctuation_report).
+    window -> tokens per window (default: the model limit).
+    cache  -> reuse predictions from the shared result cache.
+    variant-> "cpu-fast" for the int8 dynamically quantized model (see check_cpu_fast).
+    export -> "torchscript" or "onnx" to load a cached exported artifact (see common.model_export).
+    Returns the report dict, with the word alignment counts under 'alignment'.
+    """
+    if device is None:
+        import torch
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if model is None or tokenizer is None:
+        with timer("punct.load_model"):
+            model, tokenizer = get_model("token-classification", model_name, device=device, variant=variant,
+                                         export=export)
+    if window is None:
+        window = tokenizer.model_max_length - 2
+
+    recognized_words = [[w for w in tokenize_uk.tokenize_words(recognized) if w not in ['.', ',', '?', '!']]
+                        for recognized, _ in documents]
+    with timer("punct.predict"):
+        _, text_preds = get_word_predictions_batched(model, tokenizer, recognized_words, is_split_to_words=True,
+                                                     device=device, batch_size=batch_size, window=window, stride=stride,
+                                                     cache=cache)
+
+    true_tags = []
+    pred_tags = []
+    ops = np.zeros(4, dtype=np.int64)
+    with timer("punct.align"):
+        for (_, etalon_text), words, preds in zip(documents, recognized_words, text_preds):
+            etalon_words, etalon_tags = extract_etalon_words_and_tags(etalon_text)
+            doc_true, doc_pred, doc_ops = align_tags(etalon_words, etalon_tags, words, [tag[2:] for tag in preds])
+            true_tags.extend(doc_true)
+            pred_tags.extend(doc_pred)
+            ops += doc_ops
+    count("punct.documents", len(documents))
+
+    report = punctuation_report(true_tags, pred_tags)
+    report["alignment"] = {"matched": int(ops[OK]), "substituted": int(ops[SUB]),
+                           "deleted": int(ops[DEL]), "inserted": int(ops[INS])}
+    if verbose:
+        print(f"\nDocuments: {len(documents)} | Aligned words: {len(true_tags)} | "
+              f"matched: {ops[OK]}, substituted: {ops[SUB]}, deleted: {ops[DEL]}, inserted: {ops[INS]}")
+        print_punctuation_report(report)
+    return report
+
+def evaluate_punctuation(base_to_recognize, etalon_text, window=MODEL_WINDOW, stride=None,
+                         model=None, tokenizer=None, model_name=MODEL_NAME, device=None, cache=False, variant=None,
+                         export=None):
+    """
+    window/stride -> sliding-window inference for sentences longer than the model limit
+    (ASR output without sentence-final punctuation), see get_word_predictions_batched.
+    The default window is the model limit, so every recognized word gets a tag;
+    window=None keeps the old behaviour of truncating long sentences.
+    model/tokenizer -> already-loaded pair; otherwise fetched from the shared model registry,
+    so repeated calls do not reload the weights.
+    cache -> reuse predictions from the shared result cache.
+    variant -> "cpu-fast" for the int8 dynamically quantized model (see check_cpu_fast).
+    export -> "torchscript" or "onnx" to load a cached exported artifact (see common.model_export).
+    """
+    if device is None:
+        import torch
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if model is None or tokenizer is None:
+        with timer("punct.load_model"):
+            model, tokenizer = get_model("token-classification", model_name, device=device, variant=variant,
+                                         export=export)
+    if window == MODEL_WINDOW:
+        window = tokenizer.model_max_length - 2
     
     print("Running predictions...")
-    _, text_preds = get_word_predictions(model, tokenizer, [base_to_recognize], device=device)
+    with timer("punct.predict"):
+        _, text_preds = get_word_predictions_batched(model, tokenizer, [base_to_recognize], device=device,
+                                                     window=window, stride=stride, cache=cache)
     text_preds = text_preds[0]
     # Extract just the punctuation part from the model's tags (from index 2 onward)
     pred_tags = [tag[2:] for tag in text_preds]
+    word_pred_tags = pred_tags
     
     # Extract the ideal tags from the etalon text
-    etalon_tags = extract_etalon_tags(etalon_text)
+    etalon_words, etalon_tags = extract_etalon_words_and_tags(etalon_text)
+    recognized_words = [w for w in tokenize_uk.tokenize_words(base_to_recognize) if w not in ['.', ',', '?', '!']]
     
     # Sanity check: verify the word counts match
     if len(etalon_tags) != len(pred_tags):
-        print("\n[WARNING] Word counts do not match! Alignment may be slightly off.")
+        print("\n[WARNING] Word counts do not match! Tags are paired by word alignment.")
         print(f"Etalon words: {len(etalon_tags)} | Predicted words: {len(pred_tags)}")
-        # Truncate to the shortest list to prevent index out-of-bounds errors
-        min_len = min(len(etalon_tags), len(pred_tags))
-        etalon_tags = etalon_tags[:min_len]
-        pred_tags = pred_tags[:min_len]
+        if len(recognized_words) == len(pred_tags):
+            etalon_tags, pred_tags, _ = align_tags(etalon_words, etalon_tags, recognized_words, pred_tags)
+        else:
+            # sentences were truncated by the model limit (use window=...), predicted words are unknown
+            min_len = min(len(etalon_tags), len(pred_tags))
+            etalon_tags = etalon_tags[:min_len]
+            pred_tags = pred_tags[:min_len]
 
     # Calculate TP, FP, TN, FN
     TP = FP = TN = FN = 0
@@ -80,7 +245,7 @@ def evaluate_punctuation(base_to_recognize, etalon_text):
     # Recover text by inserting predicted punctuation after each word
     tokens = tokenize_uk.tokenize_words(base_to_recognize)
     recovered = []
-    for token, tag in zip(tokens, pred_tags):
+    for token, tag in zip(tokens, word_pred_tags):
         result_token = token
         if tag != 'O':
             result_token += tag
@@ -104,6 +269,65 @@ def evaluate_punctuation(base_to_recognize, etalon_text):
     return precision, recall, f1
 
 
+def check_cpu_fast(documents, model=None, tokenizer=None, model_name=MODEL_NAME, repeats=3, batch_size=32,
+                   intra_op=None, inter_op=None):
+    """
+    Accuracy guard for the "cpu-fast" variant on a calibration set.
+    documents -> recognized texts, or (recognized, etalon) pairs
+    1. predicts tags for all documents with the fp32 model and the int8 one (best of `repeats` runs),
+    2. reports the speedup and how many word tags (case + punctuation, and punctuation only)
+       the int8 model changes,
+    3. for (recognized, etalon) pairs, also the micro F1 of both variants and its delta.
+    Returns a dict.
+    """
+    from common.cpu_fast import configure_threads, optimize_for_cpu
+
+    threads = configure_threads(intra_op, inter_op)
+    if model is None or tokenizer is None:
+        model, tokenizer = get_model("token-classification", model_name, device='cpu')
+    fp32_model, fast_model = model, optimize_for_cpu(copy.deepcopy(model))
+
+    with_etalon = bool(documents) and not isinstance(documents[0], str)
+    texts = [doc[0] if with_etalon else doc for doc in documents]
+    words = [[w for w in tokenize_uk.tokenize_words(text) if w not in ['.', ',', '?', '!']] for text in texts]
+    window = tokenizer.model_max_length - 2
+
+    timings = {}
+    tags = {}
+    for name, variant_model in (("fp32", fp32_model), ("fast", fast_model)):
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _, preds = get_word_predictions_batched(variant_model, tokenizer, words, is_split_to_words=True,
+                                                    batch_size=batch_size, window=window)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+        tags[name] = [tag for doc_preds in preds for tag in doc_preds]
+
+    n_tags = max(len(tags["fp32"]), 1)
+    result = {
+        "fp32_seconds": timings["fp32"],
+        "fast_seconds": timings["fast"],
+        "speedup": timings["fp32"] / timings["fast"],
+        "tag_agreement": sum(a == b for a, b in zip(tags["fp32"], tags["fast"])) / n_tags,
+        "punct_agreement": sum(a[2:] == b[2:] for a, b in zip(tags["fp32"], tags["fast"])) / n_tags,
+    }
+    if with_etalon:
+        for name, variant_model in (("fp32", fp32_model), ("fast", fast_model)):
+            report = evaluate_punctuation_corpus(documents, model=variant_model, tokenizer=tokenizer, device='cpu',
+                                                 batch_size=batch_size, verbose=False)
+            result[f"f1_{name}"] = report["micro"]["f1"]
+        result["f1_delta"] = result["f1_fast"] - result["f1_fp32"]
+
+    print(f"Threads: intra-op {threads[0]}, inter-op {threads[1]}")
+    print(f"fp32 {result['fp32_seconds']:.3f}s | cpu-fast {result['fast_seconds']:.3f}s | speedup x{result['speedup']:.2f}")
+    print(f"Tag agreement: {result['tag_agreement']:.4f} | punctuation agreement: {result['punct_agreement']:.4f}")
+    if with_etalon:
+        print(f"Micro F1: fp32 {result['f1_fp32']:.4f} | cpu-fast {result['f1_fast']:.4f} | delta {result['f1_delta']:+.4f}")
+    return result
+
+
 if __name__ == "__main__":
     wav2vec2_recognized_me = """і раптом літо згадавши як добре йому було прокидаються з невчасно
     розпочатої сплячки розливає сонце над нивами та лісами і спалахує навколо 
@@ -134,4 +358,15 @@ if __name__ == "__main__":
 
     #evaluate_punctuation(wav2vec2_recognized_me, wav2vec2_etalon_me)
     #evaluate_punctuation(wav2vec2_recognized_anton, wav2vec2_etalon_anton)
-    evaluate_punctuation(wav2vec2_recognized_vika, wav2vec2_etalon_vika)
\ No newline at end of file
+    evaluate_punctuation(wav2vec2_recognized_vika, wav2vec2_etalon_vika, cache=True)
+
+    # all speakers at once, scored with word alignment and per-class metrics
+    #evaluate_punctuation_corpus([(wav2vec2_recognized_me, wav2vec2_etalon_me),
+    #                             (wav2vec2_recognized_anton, wav2vec2_etalon_anton),
+    #                             (wav2vec2_recognized_vika, wav2vec2_etalon_vika)])
+
+    # speed and accuracy of the int8 "cpu-fast" model against fp32 on the same texts
+    #check_cpu_fast([(wav2vec2_recognized_anton, wav2vec2_etalon_anton),
+    #                (wav2vec2_recognized_vika, wav2vec2_etalon_vika)])
+
+    RESULT_CACHE.report()
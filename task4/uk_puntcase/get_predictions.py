@@ -1,7 +1,54 @@
+import numpy as np
 import tokenize_uk
-import torch
 
-def get_word_predictions(model, tokenizer, texts, is_split_to_words=False, device='cpu'):
+from common.instrumentation import count, profile, timer
+from common.result_cache import RESULT_CACHE, model_fingerprint
+
+CLS_ID = 101
+SEP_ID = 102
+
+
+def split_sentences(text):
+    size = len(text)
+    idx_list = [idx + 1 for idx, val in enumerate(text) if val in ['.', '?', '!']]
+    if len(idx_list):
+        return [text[i: j] for i, j in zip([0] + idx_list, idx_list + ([size] if idx_list[-1] != size else []))]
+    return [text]
+
+
+def words_from_predictions(tokenizer, tokenized_inputs, word_ids, predictions):
+    previous_word_idx = None
+    sent_words = []
+    predictions_words = []
+    word_tokens = []
+    first_pred = None
+    for i, word_idx in enumerate(word_ids):
+        if word_idx != previous_word_idx:
+            sent_words.append(tokenizer.decode(word_tokens))
+            word_tokens = [tokenized_inputs[i]]
+            predictions_words.append(first_pred)
+            first_pred = predictions[i]
+        else:
+            word_tokens.append(tokenized_inputs[i])
+        previous_word_idx = word_idx
+
+    return sent_words[1:], predictions_words[1:]
+
+
+def _cached_predictions(variant, model, tokenizer, texts, options, compute):
+    key_parts = (variant, model_fingerprint(model), getattr(tokenizer, "name_or_path", ""),
+                 [text if isinstance(text, str) else list(text) for text in texts],
+                 options)
+    return RESULT_CACHE.get_or_compute("punct", key_parts, compute)
+
+
+def get_word_predictions(model, tokenizer, texts, is_split_to_words=False, device='cpu', cache=False):
+    if cache:
+        return _cached_predictions("sentence", model, tokenizer, texts, (is_split_to_words,),
+                                   lambda: get_word_predictions(model, tokenizer, texts, is_split_to_words, device))
+
+    import torch
+
     words_res = []
     y_res = []
 
@@ -9,17 +56,12 @@ def get_word_predictions(model, tokenizer, texts, is_split_to_words=False, devic
         texts = [tokenize_uk.tokenize_words(text) for text in texts]
 
     for text in texts:
-        size = len(text)
-        idx_list = [idx + 1 for idx, val in enumerate(text) if val in ['.', '?', '!']]
-        if len(idx_list):
-            sents = [text[i: j] for i, j in zip([0] + idx_list, idx_list + ([size] if idx_list[-1] != size else []))]
-        else:
-            sents = [text]
+        sents = split_sentences(text)
 
         y_res_x = []
         words_res_x = []
         for sent_tokens in sents:
-            tokenized_inputs = [101]
+            tokenized_inputs = [CLS_ID]
             word_ids = [None]
             for word_id, word in enumerate(sent_tokens):
                 word_tokens = tokenizer.encode(word)[1:-1]
@@ -27,44 +69,170 @@ def get_word_predictions(model, tokenizer, texts, is_split_to_words=False, devic
                 word_ids += [word_id]*len(word_tokens)
             tokenized_inputs = tokenized_inputs[:(tokenizer.model_max_length-1)]
             word_ids = word_ids[:(tokenizer.model_max_length-1)]
-            tokenized_inputs += [102]
+            tokenized_inputs += [SEP_ID]
             word_ids += [None]
 
             torch_tokenized_inputs = torch.tensor(tokenized_inputs).unsqueeze(0)
             torch_attention_mask = torch.ones(torch_tokenized_inputs.shape)
-            predictions = model.forward(input_ids=torch_tokenized_inputs.to(device), attention_mask=torch_attention_mask.to(device))
+            with torch.inference_mode():
+                predictions = model.forward(input_ids=torch_tokenized_inputs.to(device), attention_mask=torch_attention_mask.to(device))
             predictions = torch.argmax(predictions.logits.squeeze(), axis=1).cpu().numpy()
             predictions = [model.config.id2label[i] for i in predictions]
 
-            previous_word_idx = None
-            sent_words = []
-            predictions_words = []
-            word_tokens = []
-            first_pred = None
-            for i, word_idx in enumerate(word_ids):
-                if word_idx != previous_word_idx:
-                    sent_words.append(tokenizer.decode(word_tokens))
-                    word_tokens = [tokenized_inputs[i]]
-                    predictions_words.append(first_pred)
-                    first_pred = predictions[i]
-                else:
-                    word_tokens.append(tokenized_inputs[i])      
-                previous_word_idx = word_idx
-
-            words_res_x.extend(sent_words[1:])
-            y_res_x.extend(predictions_words[1:])
+            sent_words, predictions_words = words_from_predictions(tokenizer, tokenized_inputs, word_ids, predictions)
+            words_res_x.extend(sent_words)
+            y_res_x.extend(predictions_words)
 
         words_res.append(words_res_x)
         y_res.append(y_res_x)
 
     return words_res, y_res
-	
-	
+
+
+def window_spans(n_tokens, window, stride):
+    """
+    [start, end) token spans of windows covering n_tokens, the last one ends at n_tokens.
+    0 < stride <= window, otherwise tokens between windows would never be predicted.
+    """
+    if stride <= 0 or stride > window:
+        raise ValueError(f"stride must be in (0, window], got stride={stride}, window={window}")
+    if n_tokens <= window:
+        return [(0, n_tokens)]
+    starts = list(range(0, n_tokens - window, stride)) + [n_tokens - window]
+    return [(start, start + window) for start in starts]
+
+
+def get_word_predictions_batched(model, tokenizer, texts, is_split_to_words=False, device='cpu', batch_size=32,
+                                 window=None, stride=None, merge='center', cache=False):
+    """
+    Same output as get_word_predictions, but:
+    1. every sentence of every text is tokenized in one fast-tokenizer call (is_split_into_words + word_ids()),
+    2. sentences are sorted by length and run in padded batches with attention masks under inference_mode,
+    3. word-level predictions are scattered back in the original order.
+    Requires a fast (Rust) tokenizer.
+    cache=True -> results are looked up in the shared result cache (keyed by the texts,
+                  model weights/revision, tokenizer and window options) before running the model.
+
+    window=None -> sentences longer than the model limit are truncated, like get_word_predictions.
+    window=N    -> long sentences are split into windows of N tokens every `stride` tokens
+                   (default N // 2); windows of all sentences are batched together and the
+                   per-token predictions are merged:
+                   merge='center' -> take the window where the token has the most context on both sides
+                   merge='vote'   -> majority label over all windows covering the token
+    """
+    if merge not in ('center', 'vote'):
+        raise ValueError(f"Unknown merge strategy: {merge}")
+    if stride is not None and (stride <= 0 or (window is not None and stride > window)):
+        raise ValueError(f"stride must be in (0, window], got stride={stride}, window={window}")
+    if cache:
+        return _cached_predictions("batched", model, tokenizer, texts, (is_split_to_words, window, stride, merge),
+                                   lambda: get_word_predictions_batched(model, tokenizer, texts, is_split_to_words,
+                                                                        device, batch_size, window, stride, merge))
+
+    import torch
+
+    if not is_split_to_words:
+        with timer("punct.split_words"):
+            texts = [tokenize_uk.tokenize_words(text) for text in texts]
+
+    sents = []
+    owners = []
+    for text_idx, text in enumerate(texts):
+        for sent_tokens in split_sentences(text):
+            sents.append(list(sent_tokens))
+            owners.append(text_idx)
+
+    words_res = [[] for _ in texts]
+    y_res = [[] for _ in texts]
+    if not sents:
+        return words_res, y_res
+
+    # 1. tokenization and windows
+    with timer("punct.tokenize"):
+        encoded = tokenizer(sents, is_split_into_words=True, add_special_tokens=False)
+    count("punct.sentences", len(sents))
+    max_content = tokenizer.model_max_length - 2
+    if window is not None:
+        window = min(window, max_content)
+        # a window clamped to the model limit keeps full coverage
+        stride = min(stride or max(1, window // 2), window)
+
+    contents = []
+    segments = []
+    for k in range(len(sents)):
+        ids = encoded["input_ids"][k]
+        word_ids = encoded.word_ids(k)
+        if window is None:
+            ids, word_ids = ids[:max_content], word_ids[:max_content]
+            spans = [(0, len(ids))]
+        else:
+            spans = window_spans(len(ids), window, stride)
+        contents.append((ids, word_ids))
+        segments.extend((k, start, end) for start, end in spans)
+
+    num_labels = len(model.config.id2label)
+    labels = [np.zeros(len(ids), dtype=np.int64) for ids, _ in contents]
+    if merge == 'vote':
+        votes = [np.zeros((len(ids), num_labels), dtype=np.int32) for ids, _ in contents]
+    else:
+        scores = [np.full(len(ids), -1.0) for ids, _ in contents]
+
+    # 2. length-sorted padded batches
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+    order = sorted(range(len(segments)), key=lambda q: segments[q][2] - segments[q][1])
+    with torch.inference_mode(), profile("punct.inference"):
+        for start in range(0, len(order), batch_size):
+            batch = [segments[q] for q in order[start:start + batch_size]]
+            width = max(seg_end - seg_start for _, seg_start, seg_end in batch) + 2
+            input_ids = torch.full((len(batch), width), pad_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+            for row, (k, seg_start, seg_end) in enumerate(batch):
+                tokenized_inputs = [CLS_ID] + contents[k][0][seg_start:seg_end] + [SEP_ID]
+                input_ids[row, :len(tokenized_inputs)] = torch.tensor(tokenized_inputs)
+                attention_mask[row, :len(tokenized_inputs)] = 1
+
+            with timer("punct.forward"):
+                logits = model(input_ids=input_ids.to(device), attention_mask=attention_mask.to(device)).logits
+                batch_preds = torch.argmax(logits, dim=-1).cpu().numpy()
+            count("punct.tokens", int(attention_mask.sum()))
+
+            for row, (k, seg_start, seg_end) in enumerate(batch):
+                seg_labels = batch_preds[row, 1:1 + seg_end - seg_start]
+                positions = np.arange(seg_start, seg_end)
+                if merge == 'vote':
+                    votes[k][positions, seg_labels] += 1
+                    continue
+                # distance to the closest window edge that is not a sentence edge
+                n_tokens = len(labels[k])
+                left = positions - seg_start if seg_start > 0 else np.full(len(positions), np.inf)
+                right = seg_end - 1 - positions if seg_end < n_tokens else np.full(len(positions), np.inf)
+                score = np.minimum(left, right)
+                better = score > scores[k][seg_start:seg_end]
+                labels[k][seg_start:seg_end][better] = seg_labels[better]
+                scores[k][seg_start:seg_end][better] = score[better]
+
+    # 3. word-level tags, back in the original order
+    with timer("punct.tags"):
+        for k, (ids, word_ids) in enumerate(contents):
+            sent_labels = votes[k].argmax(axis=1) if merge == 'vote' else labels[k]
+            predictions = [None] + [model.config.id2label[i] for i in sent_labels.tolist()] + [None]
+            sent_words, predictions_words = words_from_predictions(tokenizer, [CLS_ID] + ids + [SEP_ID], [None] + word_ids + [None], predictions)
+            words_res[owners[k]].extend(sent_words)
+            y_res[owners[k]].extend(predictions_words)
+
+    return words_res, y_res
+
+
 def recover_text(text, model, tokenizer, device='cpu'):
     text_words, text_preds = get_word_predictions(model, tokenizer, [text], device=device)
-    text_words = text_words[0]
-    text_preds = text_preds[0]
-    
+    return apply_predictions(text_words[0], text_preds[0])
+
+
+def apply_predictions(text_words, text_preds):
+    """
+    Restores case and punctuation of words from their predicted tags.
+    """
+    text_words = list(text_words)
     for i in range(len(text_words)):
         pred_case = text_preds[i][:2]
         pred_punct = text_preds[i][2:]
@@ -75,4 +243,4 @@ def recover_text(text, model, tokenizer, device='cpu'):
         if pred_punct!='O':
             text_words[i] += pred_punct
 
-    return ' '.join(text_words)
\ No newline at end of file
+    return ' '.join(text_words)
@@ -0,0 +1,203 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.audio_cache import get_resampler
+from common.instrumentation import count, timer
+from common.model_registry import get_model
+from separate import MODEL_NAME
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg")
+# with pad=True, the longest item of a batch is at most this much longer than the shortest one
+MAX_PAD_RATIO = 1.1
+
+
+def list_inputs(source):
+    """
+    source -> directory (every audio file that is not a separation output)
+              or a manifest file with one audio path per line.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in sorted(os.listdir(source))
+                 if name.lower().endswith(AUDIO_EXTENSIONS) and "_est_speaker_" not in name]
+    else:
+        with open(source, encoding='utf-8') as f:
+            paths = [line.strip() for line in f if line.strip()]
+    return paths
+
+
+def output_paths(mix_path, output_dir, n_src):
+    base_name = os.path.splitext(os.path.basename(mix_path))[0]
+    return [os.path.join(output_dir, f"{base_name}_est_speaker_{i+1}.wav") for i in range(n_src)]
+
+
+def is_up_to_date(mix_path, outputs):
+    mix_mtime = os.path.getmtime(mix_path)
+    return all(os.path.exists(p) and os.path.getmtime(p) >= mix_mtime for p in outputs)
+
+
+def load_mono(path, target_sr):
+    """
+    Decodes a file to a mono float32 tensor at target_sr (runs in the I/O thread pool).
+    """
+    import soundfile
+    import torch
+
+    with timer("audio.decode"):
+        data, sr = soundfile.read(path, dtype='float32', always_2d=True)
+    mix_tensor = torch.from_numpy(data.mean(axis=1))
+    if sr != target_sr:
+        with timer("audio.resample"):
+            mix_tensor = get_resampler(sr, target_sr)(mix_tensor)
+    return mix_tensor
+
+
+def _write_outputs(est_sources, paths, sample_rate):
+    import soundfile
+
+    with timer("separate.save"):
+        for source, path in zip(est_sources, paths):
+            soundfile.write(path, source.numpy(), sample_rate, subtype='FLOAT')
+
+
+def _group(items, pad, max_pad_ratio=MAX_PAD_RATIO):
+    """
+    Splits decoded (path, tensor) items into model batches:
+    pad=False -> only equal-length items share a batch (results identical to one-by-one)
+    pad=True  -> items of similar length share a batch, zero-padded to the longest one, and a new
+                 batch starts once that would exceed max_pad_ratio x the shortest length.
+                 ConvTasNet's global layer norm also sees the padding, so padded outputs
+                 differ slightly from one-by-one results.
+    """
+    if pad:
+        groups = []
+        for item in sorted(items, key=lambda item: item[1].shape[-1]):
+            if groups and item[1].shape[-1] <= max_pad_ratio * groups[-1][0][1].shape[-1]:
+                groups[-1].append(item)
+            else:
+                groups.append([item])
+        return groups
+    by_length = defaultdict(list)
+    for item in items:
+        by_length[item[1].shape[-1]].append(item)
+    return list(by_length.values())
+
+
+def separate_many(mix_paths, output_dir="task5/", model_name=MODEL_NAME, model=None,
+                  batch_size=8, io_workers=4, pad=False, force=False, variant=None,
+                  export=None):
+    """
+    Batch separation pipeline:
+    1. skips files whose outputs exist and are newer than the input (unless force=True),
+    2. decodes and resamples upcoming files in a background thread pool while the model runs,
+    3. groups decoded files into batched model(...) calls (equal lengths only; pad=True also
+       zero-pads files of similar length together, which changes their outputs slightly, see _group),
+    4. writes the separated tracks asynchronously.
+    Returns a stats dict with files/sec and the real-time factor.
+    variant -> "cpu-fast" only means inference_mode for ConvTasNet (no Linear/LSTM layers to quantize),
+    "cpu-fast-pointwise" also rewrites its 1x1 convolutions as int8 Linear layers.
+    export -> "torchscript" or "onnx" to load a cached exported artifact (see common.model_export).
+    """
+    import torch
+
+    if model is None:
+        model = get_model("asteroid", model_name, variant=variant, export=export)
+    sample_rate = int(model.sample_rate)
+    n_src = model.get_model_args()["n_src"]
+    os.makedirs(output_dir, exist_ok=True)
+
+    todo = [p for p in mix_paths if force or not is_up_to_date(p, output_paths(p, output_dir, n_src))]
+    skipped = len(mix_paths) - len(todo)
+    print(f"Files: {len(mix_paths)} | to process: {len(todo)} | up to date: {skipped}")
+
+    start_time = time.perf_counter()
+    audio_samples = 0
+    prefetch = 2 * batch_size
+    with ThreadPoolExecutor(max_workers=io_workers) as readers, ThreadPoolExecutor(max_workers=1) as writers:
+        upcoming = iter(todo)
+        pending = deque()
+        writes = []
+
+        def fill():
+            while len(pending) < prefetch:
+                path = next(upcoming, None)
+                if path is None:
+                    return
+                pending.append((path, readers.submit(load_mono, path, sample_rate)))
+
+        fill()
+        while pending:
+            items = []
+            while pending and len(items) < batch_size:
+                path, future = pending.popleft()
+                items.append((path, future.result()))
+                fill()
+
+            for group in _group(items, pad):
+                lengths = [tensor.shape[-1] for _, tensor in group]
+                batch = torch.zeros(len(group), 1, max(lengths))
+                for row, (_, tensor) in enumerate(group):
+                    batch[row, 0, :lengths[row]] = tensor
+
+                with torch.inference_mode(), timer("separate.forward"):
+                    est_sources = model(batch)
+                count("separate.samples", sum(lengths))
+
+                for row, (path, _) in enumerate(group):
+                    writes.append(writers.submit(_write_outputs, est_sources[row, :, :lengths[row]].clone(),
+                                                 output_paths(path, output_dir, n_src), sample_rate))
+                    audio_samples += lengths[row]
+
+        for future in writes:
+            future.result()
+
+    elapsed = time.perf_counter() - start_time
+    audio_seconds = audio_samples / sample_rate
+    stats = {
+        "files": len(todo),
+        "skipped": skipped,
+        "seconds": elapsed,
+        "files_per_sec": len(todo) / elapsed if elapsed > 0 else 0.0,
+        "rtf": elapsed / audio_seconds if audio_seconds > 0 else 0.0,
+    }
+    print(f"Processed {stats['files']} files in {elapsed:.2f}s "
+          f"({stats['files_per_sec']:.2f} files/sec, RTF {stats['rtf']:.3f})")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch speech separation.")
+    parser.add_argument("source", help="directory with mixtures or a manifest with one path per line")
+    parser.add_argument("-o", "--output-dir", default="task5/")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--io-workers", type=int, default=4)
+    parser.add_argument("--pad", action="store_true", help="batch files of similar length by zero-padding; padded outputs differ "
+                             "slightly from separating each file alone")
+    parser.add_argument("--force", action="store_true", help="re-process files whose outputs are up to date")
+    parser.add_argument("--cpu-fast", action="store_true",
+                        help="cpu-fast variant; ConvTasNet has no Linear/LSTM layers, so this quantizes nothing "
+                             "(the model already runs under inference_mode, see --pointwise)")
+    parser.add_argument("--pointwise", action="store_true",
+                        help="cpu-fast with the 1x1 convolutions rewritten as int8 Linear layers; "
+                             "check the accuracy with separate.check_cpu_fast(..., pointwise=True)")
+    parser.add_argument("--export", choices=["torchscript", "onnx"],
+                        help="load the model from an exported artifact, exporting it on the first run")
+    parser.add_argument("--threads", type=int, help="intra-op threads (torch.set_num_threads)")
+    parser.add_argument("--interop-threads", type=int, help="inter-op threads (torch.set_num_interop_threads)")
+    args = parser.parse_args()
+
+    from common.cpu_fast import CPU_FAST, CPU_FAST_POINTWISE, configure_threads
+
+    configure_threads(args.threads, args.interop_threads)
+    separate_many(list_inputs(args.source), output_dir=args.output_dir, model_name=args.model,
+                  batch_size=args.batch_size, io_workers=args.io_workers, pad=args.pad, force=args.force,
+                  variant=CPU_FAST_POINTWISE if args.pointwise else CPU_FAST if args.cpu_fast else None, export=args.export)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,90 @@
+import argparse
+import csv
 import os
-import torch
-import torchaudio
+import re
+import sys
 
-def calculate_snr(estimate_path, reference_path):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.audio_cache import load_audio
+
+def estimate_lag(est, ref, max_lag):
+    """
+    Lag (in samples) of est relative to ref from FFT cross-correlation, O(n log n).
+    Positive -> est is delayed. The search is limited to [-max_lag, max_lag].
+    """
+    import torch
+
+    n = est.shape[-1] + ref.shape[-1] - 1
+    n_fft = 1 << (n - 1).bit_length()
+    corr = torch.fft.irfft(torch.fft.rfft(est, n_fft) * torch.conj(torch.fft.rfft(ref, n_fft)), n_fft)
+    max_lag = min(max_lag, n_fft // 2 - 1)
+    # circular layout: lags 0..max_lag at the start, negative lags at the end
+    window = torch.cat([corr[..., n_fft - max_lag:], corr[..., :max_lag + 1]], dim=-1)
+    return int(torch.argmax(window, dim=-1)) - max_lag
+
+
+def align(est, ref, lag=0):
+    """
+    Shifts by `lag` (see estimate_lag) and trims both signals to the same length.
+    """
+    if lag > 0:
+        est = est[..., lag:]
+    elif lag < 0:
+        ref = ref[..., -lag:]
+    min_len = min(est.shape[-1], ref.shape[-1])
+    return est[..., :min_len], ref[..., :min_len]
+
+
+def segmental_snr(est, ref, frame_len, hop=None, min_db=-10.0, max_db=35.0, eps=1e-8):
+    """
+    Per-frame SNR in dB over strided views of the signals (no Python loop),
+    clamped to [min_db, max_db] as usual for segmental SNR.
+    The signals are zero-padded to whole frames: a trailing partial frame (or a signal
+    shorter than frame_len, which becomes a single frame) is scored over its real samples,
+    since zeros add no energy to either the signal or the noise.
+    Returns (mean over frames, per-frame curve).
+    """
+    import math
+    import torch
+
+    hop = hop or frame_len
+    n_frames = max(1, math.ceil((ref.shape[-1] - frame_len) / hop) + 1)
+    pad = (n_frames - 1) * hop + frame_len - ref.shape[-1]
+    ref = torch.nn.functional.pad(ref, (0, pad))
+    est = torch.nn.functional.pad(est, (0, pad))
+    ref_frames = ref.unfold(-1, frame_len, hop)
+    noise_frames = (est - ref).unfold(-1, frame_len, hop)
+    curve = 10 * torch.log10(((ref_frames ** 2).sum(-1) + eps) / ((noise_frames ** 2).sum(-1) + eps))
+    curve = curve.clamp(min_db, max_db)
+    return curve.mean().item(), curve
+
+
+def _load_pair(estimate_path, reference_path, compensate_lag, max_lag_seconds):
+    # Load audio files (mono, estimate resampled to the reference rate).
+    # Decoded audio is cached on disk, so scoring several estimates against
+    # the same MP3 reference decodes it only once.
+    ref_tensor, ref_sr = load_audio(reference_path)
+    est_tensor, est_sr = load_audio(estimate_path, target_sr=ref_sr)
+
+    # Optionally compensate a model framing delay / editing offset
+    lag = 0
+    if compensate_lag:
+        lag = estimate_lag(est_tensor[0], ref_tensor[0], int(max_lag_seconds * ref_sr))
+
+    # Trim to the exact same length (model framing can alter length slightly)
+    est, ref = align(est_tensor, ref_tensor, lag)
+    return est, ref, ref_sr, lag
+
+
+def calculate_snr(estimate_path, reference_path, compensate_lag=False, max_lag_seconds=0.5):
     """
     Calculates the SNR between an estimated audio file and its ground truth.
+    compensate_lag -> align the estimate to the reference first (lag searched within max_lag_seconds).
     """
-    # Load audio files
-    est_tensor, est_sr = torchaudio.load(estimate_path)
-    ref_tensor, ref_sr = torchaudio.load(reference_path)
-    
-    # 1. Match Sample Rates
-    if est_sr != ref_sr:
-        print(f"Sample rate mismatch. Resampling estimate to {ref_sr}Hz...")
-        resampler = torchaudio.transforms.Resample(est_sr, ref_sr)
-        est_tensor = resampler(est_tensor)
-        
-    # 2. Downmix to mono if necessary (for fair comparison)
-    if est_tensor.shape[0] > 1: est_tensor = torch.mean(est_tensor, dim=0, keepdim=True)
-    if ref_tensor.shape[0] > 1: ref_tensor = torch.mean(ref_tensor, dim=0, keepdim=True)
-
-    # 3. Trim to the exact same length (model framing can alter length slightly)
-    min_len = min(est_tensor.shape[-1], ref_tensor.shape[-1])
-    est = est_tensor[..., :min_len]
-    ref = ref_tensor[..., :min_len]
-    
-    # 4. Calculate SNR
+    import torch
+
+    est, ref, _, _ = _load_pair(estimate_path, reference_path, compensate_lag, max_lag_seconds)
+
     noise = est - ref
     signal_power = torch.sum(ref ** 2)
     noise_power = torch.sum(noise ** 2) + 1e-8 # Prevent division by zero
@@ -34,32 +93,147 @@ def calculate_snr(estimate_path, reference_path):
     
     return snr.item()
 
-if __name__ == "__main__":
-    # Manually pair your files here after listening to them
-    #ESTIMATED_FILE = "task5/speakers_12_merged_Audacity_est_speaker_1.wav"
-    #GROUND_TRUTH_FILE = "speaker1_me_20sec.mp3"
+def calculate_segmental_snr(estimate_path, reference_path, frame_seconds=1.0, compensate_lag=False, max_lag_seconds=0.5):
+    """
+    Segmental SNR: mean over frames of frame_seconds, plus the per-frame curve
+    (one value per second by default) to compare against listening.
+    Returns (mean dB, per-frame tensor, lag in samples).
+    """
+    est, ref, sr, lag = _load_pair(estimate_path, reference_path, compensate_lag, max_lag_seconds)
+    mean, curve = segmental_snr(est[0], ref[0], int(frame_seconds * sr))
+    return mean, curve, lag
 
-    #ESTIMATED_FILE = "task5/speakers_12_merged_Audacity_est_speaker_2.wav"
-    #GROUND_TRUTH_FILE = "task5/speaker2_Anton_20sec.mp3"
-    
-    #ESTIMATED_FILE = "task5/speakers_13_merged_Audacity_est_speaker_2.wav"
-    #GROUND_TRUTH_FILE = "task5/speaker1_me_20sec.mp3"
+def _stack(paths, sample_rate):
+    return [load_audio(p, target_sr=sample_rate)[0][0] for p in paths]
 
-    #ESTIMATED_FILE = "task5/speakers_13_merged_Audacity_est_speaker_1.wav"
-    #GROUND_TRUTH_FILE = "task5/speaker3_Vika_20s.mp3"
 
-    #ESTIMATED_FILE = "task5/speakers_23_merged_Audacity_est_speaker_2.wav"
-    #GROUND_TRUTH_FILE = "task5/speaker2_Anton_20sec.mp3"
+def _trim(*groups):
+    import torch
 
-    ESTIMATED_FILE = "task5/speakers_23_merged_Audacity_est_speaker_1.wav"
-    GROUND_TRUTH_FILE = "task5/speaker3_Vika_20s.mp3"
+    min_len = min(t.shape[-1] for group in groups for t in group)
+    return [torch.stack([t[:min_len] for t in group]) for group in groups]
 
-    if os.path.exists(ESTIMATED_FILE) and os.path.exists(GROUND_TRUTH_FILE):
-        snr_value = calculate_snr(ESTIMATED_FILE, GROUND_TRUTH_FILE)
-        print(f"---")
-        print(f"Estimate:  {ESTIMATED_FILE}")
-        print(f"Reference: {GROUND_TRUTH_FILE}")
-        print(f"Resulting SNR: {snr_value:.2f} dB")
+
+def snr_matrix(est, ref, eps=1e-8):
+    """
+    SNR in dB for every (estimate, reference) pair.
+    est [N, T], ref [M, T] -> [N, M]
+    The noise energy ||est - ref||^2 is summed directly in float64, one estimate against all
+    references at a time (N, M are the speaker counts): expanding it as
+    ||est||^2 + ||ref||^2 - 2 est.ref cancels catastrophically at high SNR.
+    """
+    import torch
+
+    est64, ref64 = est.double(), ref.double()
+    ref_power = (ref64 ** 2).sum(-1)
+    noise_power = torch.stack([((e - ref64) ** 2).sum(-1) for e in est64]) + eps
+    return (10 * torch.log10(ref_power / noise_power)).to(est.dtype)
+
+
+def si_sdr_matrix(est, ref, eps=1e-8):
+    """
+    Scale-invariant SDR in dB for every (estimate, reference) pair.
+    est [N, T], ref [M, T] -> [N, M]
+    """
+    import torch
+
+    dtype = est.dtype
+    # float64: est_power - target_power cancels at high SI-SDR
+    est = est.double() - est.double().mean(-1, keepdim=True)
+    ref = ref.double() - ref.double().mean(-1, keepdim=True)
+    cross = est @ ref.T
+    ref_power = (ref ** 2).sum(-1) + eps
+    est_power = (est ** 2).sum(-1, keepdim=True)
+    # projection of est onto ref: ||target||^2 = (est.ref)^2 / ||ref||^2, the residual is orthogonal
+    target_power = cross ** 2 / ref_power
+    noise_power = (est_power - target_power).clamp_min(0) + eps
+    return (10 * torch.log10(target_power / noise_power + eps)).to(dtype)
+
+
+def evaluate_mixture(mix_path, est_paths, ref_paths, metric="si_sdr"):
+    """
+    Scores all separated estimates of one mixture against all references and pairs them
+    with the Hungarian algorithm (maximizing `metric`). Everything is resampled to the
+    rate of the first reference. Returns one row per assigned pair.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    sample_rate = load_audio(ref_paths[0])[1]
+    refs, ests, mixes = _trim(_stack(ref_paths, sample_rate), _stack(est_paths, sample_rate),
+                              _stack([mix_path], sample_rate))
+
+    matrices = {"snr": snr_matrix(ests, refs), "si_sdr": si_sdr_matrix(ests, refs)}
+    # improvement over using the unprocessed mixture as the estimate
+    matrices["si_sdr_improvement"] = matrices["si_sdr"] - si_sdr_matrix(mixes, refs)
+
+    est_idx, ref_idx = linear_sum_assignment(matrices[metric].numpy(), maximize=True)
+    rows = []
+    for i, j in zip(est_idx, ref_idx):
+        rows.append({
+            "mixture": mix_path,
+            "estimate": est_paths[i],
+            "reference": ref_paths[j],
+            **{name: float(matrix[i, j]) for name, matrix in matrices.items()},
+        })
+    return rows
+
+
+def find_mixtures(directory):
+    """
+    Auto-discovers mixtures in a directory using the naming of this task:
+    speakers_<ids>_merged*.wav            -> mixture
+    <mixture>_est_speaker_<n>.wav         -> its separated estimates
+    speaker<id>_*.mp3 / .wav              -> reference of speaker <id>
+    Returns a list of (mixture, estimates, references).
+    """
+    names = sorted(os.listdir(directory))
+    references = {}
+    for name in names:
+        match = re.match(r"speaker(\d+)_", name)
+        if match and "_est_speaker_" not in name:
+            references[match.group(1)] = os.path.join(directory, name)
+
+    jobs = []
+    for name in names:
+        match = re.match(r"speakers_(\d+)_.*\.wav$", name)
+        if not match or "_est_speaker_" in name:
+            continue
+        base = os.path.splitext(name)[0]
+        estimates = [os.path.join(directory, n) for n in names if n.startswith(f"{base}_est_speaker_")]
+        refs = [references[digit] for digit in match.group(1) if digit in references]
+        if estimates and refs:
+            jobs.append((os.path.join(directory, name), estimates, refs))
+    return jobs
+
+
+def evaluate_directory(directory, output_file, metric="si_sdr"):
+    rows = []
+    for mix_path, est_paths, ref_paths in find_mixtures(directory):
+        rows.extend(evaluate_mixture(mix_path, est_paths, ref_paths, metric=metric))
+
+    fields = ["mixture", "estimate", "reference", "snr", "si_sdr", "si_sdr_improvement"]
+    with open(output_file, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Permutation-invariant SNR / SI-SDR evaluation.")
+    parser.add_argument("directory", nargs="?", default="task5/")
+    parser.add_argument("-o", "--output", default="task5/snr_results.csv")
+    parser.add_argument("--metric", default="si_sdr", choices=["snr", "si_sdr", "si_sdr_improvement"],
+                        help="metric maximized by the estimate/reference assignment")
+    args = parser.parse_args()
+
+    results = evaluate_directory(args.directory, args.output, metric=args.metric)
+    if not results:
+        print(f"Error: no mixtures with estimates and references found in {args.directory}")
+    for row in results:
         print(f"---")
-    else:
-        print("Error: Could not find one or both of the specified audio files.")
\ No newline at end of file
+        print(f"Estimate:  {row['estimate']}")
+        print(f"Reference: {row['reference']}")
+        print(f"SNR: {row['snr']:.2f} dB | SI-SDR: {row['si_sdr']:.2f} dB | SI-SDRi: {row['si_sdr_improvement']:.2f} dB")
+    print(f"---")
+    print(f"Saved: {args.output}")
@@ -1,48 +1,263 @@
+import copy
+import itertools
 import os
-import torch
+import sys
+import time
 import numpy
-import torchaudio
-from asteroid.models import BaseModel
 
-def separate_audio(mix_path, output_dir="task5/", model_name="JorisCos/ConvTasNet_Libri2Mix_sepclean_8k"):
-    """
-    Loads a mixed audio file, separates it using Asteroid, and saves the output tracks.
-    """
-    print(f"Loading Asteroid model: {model_name}...")
-    model = BaseModel.from_pretrained(model_name)
-    model.eval()
+# torch, torchaudio and soundfile are imported inside the functions that use them,
+# so importing this module (e.g. for MODEL_NAME) stays cheap
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.audio_cache import get_resampler, load_audio
+from common.instrumentation import count, profile, timer
+from common.model_registry import get_model
+from common.result_cache import RESULT_CACHE, file_digest, model_fingerprint
 
-    print(f"Processing: {mix_path}")
-    mix_tensor, sr = torchaudio.load(mix_path)
-    
-    # Resample if necessary to match model's expected sample rate
-    if sr != model.sample_rate:
-        print(f"Resampling from {sr}Hz to {model.sample_rate}Hz...")
-        resampler = torchaudio.transforms.Resample(sr, model.sample_rate)
-        mix_tensor = resampler(mix_tensor)
-    
-    # Downmix to mono if stereo
-    if mix_tensor.shape[0] > 1:
-        mix_tensor = torch.mean(mix_tensor, dim=0, keepdim=True)
+MODEL_NAME = "JorisCos/ConvTasNet_Libri2Mix_sepclean_8k"
+
+def _separate(model, mix_path):
+    import torch
+
+    # Decoded, downmixed to mono and resampled to the model's rate once,
+    # repeat runs are served from the on-disk audio cache
+    with timer("separate.load_audio"):
+        mix_tensor, sr = load_audio(mix_path, target_sr=int(model.sample_rate))
+    count("separate.samples", mix_tensor.shape[-1])
 
     # Add batch dimension [batch, channels, time]
     mix_tensor = mix_tensor.unsqueeze(0)
         
     # Separate
-    with torch.no_grad():
+    with torch.inference_mode(), timer("separate.forward"), profile("separate.forward"):
         est_sources = model(mix_tensor)
         
     # Remove batch dimension -> [n_sources, time]
-    est_sources = est_sources.squeeze(0) 
+    return est_sources.squeeze(0)
+
+def separate_audio(mix_path, output_dir="task5/", model_name=MODEL_NAME, model=None, cache=False, variant=None,
+                   export=None):
+    """
+    Loads a mixed audio file, separates it using Asteroid, and saves the output tracks.
+    model -> already-loaded Asteroid model; otherwise fetched from the shared model registry,
+    so separating many files loads the weights once.
+    cache -> separated stems are looked up in the shared result cache by the content hash
+    of the mixture and the model weights, so an unchanged file skips decoding and the model.
+    variant -> "cpu-fast" runs the model as is under inference_mode (ConvTasNet has no Linear/LSTM
+    layers to quantize), "cpu-fast-pointwise" quantizes its 1x1 convolutions to int8 (see check_cpu_fast).
+    export -> "torchscript" or "onnx" to load a cached exported artifact (see common.model_export).
+    """
+    import torch
+    import torchaudio
+
+    if model is None:
+        with timer("separate.load_model"):
+            model = get_model("asteroid", model_name, variant=variant, export=export)
+
+    print(f"Processing: {mix_path}")
+    if cache:
+        key_parts = (file_digest(mix_path), model_fingerprint(model, model_name), int(model.sample_rate))
+        est_sources = torch.from_numpy(RESULT_CACHE.get_or_compute(
+            "stems", key_parts, lambda: _separate(model, mix_path).numpy()))
+    else:
+        est_sources = _separate(model, mix_path)
     
     base_name = os.path.splitext(os.path.basename(mix_path))[0]
     
     # Save files
     for i in range(est_sources.shape[0]):
         out_path = os.path.join(output_dir, f"{base_name}_est_speaker_{i+1}.wav")
-        torchaudio.save(out_path, est_sources[i].unsqueeze(0), int(model.sample_rate))
+        with timer("separate.save"):
+            torchaudio.save(out_path, est_sources[i].unsqueeze(0), int(model.sample_rate))
         print(f"Saved: {out_path}")
 
+def _read_window(f, start, length, target_sr, resampler, margin=256):
+    """
+    Reads `length` model-rate samples starting at `start` from an open SoundFile,
+    downmixed to mono and resampled. A small margin of source samples on both sides
+    keeps resampler edge effects out of the returned window.
+    """
+    import torch
+
+    sr = f.samplerate
+    src_start = int(start * sr / target_sr)
+    src_end = int(numpy.ceil((start + length) * sr / target_sr))
+    read_start = max(0, src_start - margin)
+    f.seek(read_start)
+    data = f.read(src_end + margin - read_start, dtype='float32', always_2d=True)
+
+    window = torch.from_numpy(data.mean(axis=1))
+    if resampler is not None:
+        window = resampler(window)
+    left = int(round((src_start - read_start) * target_sr / sr))
+    window = window[left:left + length]
+    if window.shape[-1] < length:
+        window = torch.nn.functional.pad(window, (0, length - window.shape[-1]))
+    return window
+
+
+def _best_permutation(prev_tail, cur_head):
+    """
+    Speaker order of the current chunk that best matches the previous one,
+    by normalized correlation over the overlapping samples.
+    """
+    prev = prev_tail / (prev_tail.norm(dim=-1, keepdim=True) + 1e-8)
+    cur = cur_head / (cur_head.norm(dim=-1, keepdim=True) + 1e-8)
+    corr = prev @ cur.T  # [n_src (prev), n_src (cur)]
+    best, best_score = None, None
+    for perm in itertools.permutations(range(corr.shape[0])):
+        score = sum(corr[i, j].item() for i, j in enumerate(perm))
+        if best_score is None or score > best_score:
+            best, best_score = list(perm), score
+    return best
+
+
+def separate_audio_streaming(mix_path, output_dir="task5/", model_name=MODEL_NAME, model=None,
+                             chunk_seconds=10.0, overlap_seconds=1.0, variant=None, export=None):
+    """
+    Separates an arbitrarily long mixture with bounded memory:
+    1. reads the mixture in fixed-size windows that overlap by overlap_seconds,
+    2. separates every window with the model,
+    3. reorders speakers of each window by correlating the overlap with the previous one,
+    4. cross-fades the overlaps (overlap-add with a Hann window) and appends the
+       finished samples to the output WAVs.
+    Peak memory depends on chunk_seconds, not on the recording length.
+    variant/export -> as in separate_audio.
+    """
+    import soundfile
+    import torch
+
+    if model is None:
+        with timer("separate.load_model"):
+            model = get_model("asteroid", model_name, variant=variant, export=export)
+    target_sr = int(model.sample_rate)
+    chunk = int(chunk_seconds * target_sr)
+    overlap = int(overlap_seconds * target_sr)
+    if not 0 <= overlap < chunk:
+        raise ValueError("overlap_seconds must be smaller than chunk_seconds")
+    hop = chunk - overlap
+    # fade-in half of a Hann window; fade-out is 1 - fade_in
+    fade_in = torch.sin(torch.linspace(0, numpy.pi / 2, overlap)) ** 2 if overlap else None
+
+    print(f"Processing (streaming): {mix_path}")
+    base_name = os.path.splitext(os.path.basename(mix_path))[0]
+    outputs = []
+    with soundfile.SoundFile(mix_path) as f:
+        total = int(f.frames * target_sr / f.samplerate)
+        if total == 0:
+            raise ValueError(f"Empty audio file: {mix_path}")
+        resampler = None
+        if f.samplerate != target_sr:
+            print(f"Resampling from {f.samplerate}Hz to {target_sr}Hz...")
+            resampler = get_resampler(f.samplerate, target_sr)
+
+        pending = None
+        try:
+            for start in range(0, total, hop):
+                length = min(chunk, total - start)
+                with timer("separate.read_window"):
+                    window = _read_window(f, start, length, target_sr, resampler)
+                count("separate.samples", length)
+
+                with torch.no_grad(), timer("separate.forward"):
+                    est_sources = model(window.view(1, 1, -1)).squeeze(0)[..., :length]
+
+                if not outputs:
+                    for i in range(est_sources.shape[0]):
+                        out_path = os.path.join(output_dir, f"{base_name}_est_speaker_{i+1}.wav")
+                        outputs.append(soundfile.SoundFile(out_path, 'w', samplerate=target_sr, channels=1, subtype='FLOAT'))
+
+                if pending is not None:
+                    n = min(overlap, length)
+                    est_sources = est_sources[_best_permutation(pending[:, :n], est_sources[:, :n])]
+                    w = fade_in[:n]
+                    est_sources[:, :n] = pending[:, :n] * (1 - w) + est_sources[:, :n] * w
+
+                last = start + length >= total
+                done = est_sources if last else est_sources[:, :length - overlap]
+                with timer("separate.save"):
+                    for i, out in enumerate(outputs):
+                        out.write(done[i].numpy())
+                if last:
+                    break
+                pending = est_sources[:, length - overlap:]
+        finally:
+            for out in outputs:
+                out.close()
+                print(f"Saved: {out.name}")
+
+def _best_of(run, repeats):
+    import torch
+
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with torch.inference_mode():
+            result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def _stem_snr(est, ref, eps=1e-12):
+    # mean over stems of 10 log10(||ref||^2 / ||est - ref||^2), float64
+    import torch
+
+    est, ref = est.double(), ref.double()
+    snr = 10 * torch.log10((ref ** 2).sum(-1) / (((est - ref) ** 2).sum(-1) + eps))
+    return snr.mean().item()
+
+def check_cpu_fast(mix_paths, references=None, model_name=MODEL_NAME, model=None, repeats=3,
+                   intra_op=None, inter_op=None, pointwise=False):
+    """
+    Accuracy guard for the "cpu-fast" variant on a calibration set of mixtures:
+    1. separates every mixture with the fp32 model and the int8 one (best of `repeats` runs),
+    2. reports the speedup and the SNR of the int8 stems against the fp32 stems,
+    3. with references (one list of reference paths per mixture), also the SNR of both
+       variants against the references (best speaker permutation) and their delta.
+    model -> fp32 model to compare; otherwise loaded from the registry.
+    pointwise -> also quantize 1x1 convolutions (see optimize_for_cpu).
+    Returns one dict per mixture.
+    """
+    import torch
+    from scipy.optimize import linear_sum_assignment
+    from common.cpu_fast import configure_threads, optimize_for_cpu
+    from evaluate_snr import snr_matrix
+
+    threads = configure_threads(intra_op, inter_op)
+    fp32_model = model if model is not None else get_model("asteroid", model_name)
+    fast_model = optimize_for_cpu(copy.deepcopy(fp32_model), pointwise=pointwise)
+    sample_rate = int(fp32_model.sample_rate)
+    print(f"Threads: intra-op {threads[0]}, inter-op {threads[1]}")
+
+    rows = []
+    for k, mix_path in enumerate(mix_paths):
+        mix_tensor = load_audio(mix_path, target_sr=sample_rate)[0].unsqueeze(0)
+        fp32_sources, fp32_time = _best_of(lambda: fp32_model(mix_tensor)[0], repeats)
+        fast_sources, fast_time = _best_of(lambda: fast_model(mix_tensor)[0], repeats)
+        row = {
+            "mixture": mix_path,
+            "fp32_seconds": fp32_time,
+            "fast_seconds": fast_time,
+            "speedup": fp32_time / fast_time,
+            # how close the int8 stems are to the fp32 ones: noise energy of the difference
+            # summed directly in float64, this is the high-SNR regime
+            "snr_vs_fp32": _stem_snr(fast_sources, fp32_sources),
+        }
+        if references is not None:
+            refs = [load_audio(p, target_sr=sample_rate)[0][0] for p in references[k]]
+            min_len = min([fp32_sources.shape[-1]] + [r.shape[-1] for r in refs])
+            refs = torch.stack([r[:min_len] for r in refs])
+            for name, sources in (("fp32", fp32_sources), ("fast", fast_sources)):
+                matrix = snr_matrix(sources[:, :min_len], refs).numpy()
+                est_idx, ref_idx = linear_sum_assignment(matrix, maximize=True)
+                row[f"snr_{name}"] = float(matrix[est_idx, ref_idx].mean())
+            row["snr_delta"] = row["snr_fast"] - row["snr_fp32"]
+        rows.append(row)
+
+        print(f"{mix_path}: fp32 {fp32_time:.3f}s | cpu-fast {fast_time:.3f}s | speedup x{row['speedup']:.2f} | "
+              f"SNR vs fp32 {row['snr_vs_fp32']:.2f} dB"
+              + (f" | SNR delta {row['snr_delta']:+.3f} dB" if references is not None else ""))
+    return rows
+
 if __name__ == "__main__":
     # Specify your mixed file here
     #MIXED_FILE = "task5/speakers_12_merged_Audacity.wav"
@@ -50,6 +265,7 @@ if __name__ == "__main__":
     MIXED_FILE = "task5/speakers_23_merged_Audacity.wav" 
     
     if os.path.exists(MIXED_FILE):
-        separate_audio(MIXED_FILE)
+        separate_audio(MIXED_FILE, cache=True)
+        RESULT_CACHE.report()
     else:
         print(f"Error: {MIXED_FILE} not found.")
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("", "task2_src", "task4", "task5"):
+    path = os.path.join(ROOT, sub)
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+UK_LETTERS = "абвгґдеєжзиіїйклмнопрстуфхцчшщьюя"
+
+
+@pytest.fixture(scope="session")
+def tiny_punct_model(tmp_path_factory):
+    """
+    Randomly initialised BERT token classifier + WordPiece tokenizer, saved to a temp directory.
+    Returns (path, model, tokenizer).
+    """
+    transformers = pytest.importorskip("transformers")
+    import torch
+
+    directory = str(tmp_path_factory.mktemp("tiny_punct"))
+    # [CLS]/[SEP] at 101/102 like the real model, get_predictions uses these ids
+    vocab = ["[PAD]"] + [f"[unused{i}]" for i in range(99)] + ["[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += list(UK_LETTERS) + ["##" + c for c in UK_LETTERS] + list(".,?!")
+    with open(os.path.join(directory, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab) + "\n")
+    tokenizer = transformers.BertTokenizerFast(os.path.join(directory, "vocab.txt"), model_max_length=24)
+    labels = ["ooO", "oo,", "oo.", "AaO", "Aa,", "Aa.", "oo?", "oo!"]
+    config = transformers.BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2,
+                                     num_attention_heads=2, intermediate_size=64, max_position_embeddings=64,
+                                     num_labels=len(labels), id2label=dict(enumerate(labels)),
+                                     label2id={l: i for i, l in enumerate(labels)})
+    torch.manual_seed(0)
+    model = transformers.BertForTokenClassification(config).eval()
+    model.save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    return directory, model, tokenizer
+
+
+def random_words(n_words, seed=0):
+    import random
+
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choice(UK_LETTERS) for _ in range(rng.randint(1, 8))) for _ in range(n_words))
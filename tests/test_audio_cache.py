@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import common.audio_cache as audio_cache
+
+
+@pytest.fixture
+def fake_decode(monkeypatch, tmp_path):
+    # decoding needs FFmpeg; the cache logic only needs some array per file
+    def decode(path, target_sr=None):
+        with open(path, 'rb') as f:
+            n = len(f.read())
+        return np.arange(n, dtype=np.float32), target_sr or 8000
+
+    monkeypatch.setattr(audio_cache, "decode_audio", decode)
+
+
+def _write(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_entry_larger_than_cache_is_served_from_memory(tmp_path, fake_decode):
+    cache = audio_cache.AudioCache(str(tmp_path / "cache"), max_bytes=100)
+    path = _write(tmp_path, "big.wav", 1000)
+    audio, sr = cache.load(path)
+    assert len(audio) == 1000 and sr == 8000
+
+
+def test_newest_entry_is_not_evicted(tmp_path, fake_decode):
+    cache = audio_cache.AudioCache(str(tmp_path / "cache"), max_bytes=3000)
+    first = _write(tmp_path, "a.wav", 500)
+    second = _write(tmp_path, "b.wav", 500)
+    cache.load(first)
+    audio, _ = cache.load(second)
+    assert len(audio) == 500
+    # the older entry made room for the newer one
+    assert cache.load(second)[0] is not None and cache.hits == 1
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_with_env(**env):
+    return subprocess.run([sys.executable, "-c", "import common.instrumentation as i; print(i.PROFILER)"],
+                          cwd=ROOT, env=dict(os.environ, **env), capture_output=True, text=True)
+
+
+def test_generic_profile_variable_is_ignored():
+    result = _import_with_env(PROFILE="dev")
+    assert result.returncode == 0 and result.stdout.strip() == "None"
+
+
+def test_unknown_profiler_warns_and_disables():
+    result = _import_with_env(VOICERECOGNITION_PROFILE="dev")
+    assert result.returncode == 0 and result.stdout.strip() == "None"
+    assert "WARNING" in result.stderr
+
+
+def _enabled_with_env(**env):
+    return subprocess.run([sys.executable, "-c", "import common.instrumentation as i; print(i.ENABLED)"],
+                          cwd=ROOT, env=dict(os.environ, **env), capture_output=True, text=True)
+
+
+def test_generic_instrumentation_variable_is_ignored():
+    result = _enabled_with_env(INSTRUMENTATION="1")
+    assert result.returncode == 0 and result.stdout.strip() == "False"
+
+
+def test_unknown_exporter_warns_and_disables():
+    result = _enabled_with_env(VOICERECOGNITION_INSTRUMENTATION="stdout,1")
+    assert result.returncode == 0 and result.stdout.strip() == "False"
+    assert "WARNING" in result.stderr and "Unknown exporter: 1" in result.stderr
+
+
+def test_known_exporter_enables():
+    result = _enabled_with_env(VOICERECOGNITION_INSTRUMENTATION="stdout")
+    assert result.returncode == 0 and result.stdout.strip().splitlines()[0] == "True"
@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+import common.levenshtein as levenshtein_module
+from common.alignment import OK, SUB, DEL, INS
+from common.levenshtein import levenshtein
+from task_2 import calculate_metrics
+
+
+def brute_force(ref, hyp):
+    """
+    Full-matrix DP, backtraced from the end preferring match/substitution, then deletion, then insertion.
+    Returns (S, I, D, edits).
+    """
+    n, m = len(ref), len(hyp)
+    d = [[i + j if i == 0 or j == 0 else 0 for j in range(m + 1)] for i in range(n + 1)]
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            d[i][j] = min(d[i - 1][j - 1] + (ref[i - 1] != hyp[j - 1]), d[i - 1][j] + 1, d[i][j - 1] + 1)
+    edits = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and d[i][j] == d[i - 1][j - 1] + (ref[i - 1] != hyp[j - 1]):
+            edits.append(OK if ref[i - 1] == hyp[j - 1] else SUB)
+            i, j = i - 1, j - 1
+        elif i > 0 and d[i][j] == d[i - 1][j] + 1:
+            edits.append(DEL)
+            i -= 1
+        else:
+            edits.append(INS)
+            j -= 1
+    edits.reverse()
+    return edits.count(SUB), edits.count(INS), edits.count(DEL), edits
+
+
+def random_pairs(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        ref = [rng.randint(0, 3) for _ in range(rng.randint(0, 25))]
+        hyp = [rng.randint(0, 3) for _ in range(rng.randint(0, 25))]
+        yield ref, hyp
+
+
+@pytest.mark.parametrize("block_bytes", [64 << 20, 1, 300])
+def test_matches_brute_force(monkeypatch, block_bytes):
+    # small budgets force the checkpointed, block-by-block backtrace
+    monkeypatch.setattr(levenshtein_module, "_BLOCK_BYTES", block_bytes)
+    for ref, hyp in random_pairs(500, seed=block_bytes):
+        S, I, D, edits = brute_force(ref, hyp)
+        result = levenshtein(np.array(ref), np.array(hyp))
+        assert (result["S"], result["I"], result["D"]) == (S, I, D)
+        assert result["distance"] == S + I + D
+        assert result["C"] == len(ref) - S - D
+
+        ref_pos, hyp_pos, ops = result["path"]
+        assert ops.tolist() == edits
+        assert ref_pos[ref_pos >= 0].tolist() == list(range(len(ref)))
+        assert hyp_pos[hyp_pos >= 0].tolist() == list(range(len(hyp)))
+
+        counts = levenshtein(np.array(ref), np.array(hyp), backtrace=False)
+        assert "path" not in counts
+        assert (counts["S"], counts["I"], counts["D"]) == (S, I, D)
+
+
+def test_calculate_metrics_matches_brute_force():
+    rng = random.Random(7)
+    words = ["а", "б", "в", "г", "ґ"]
+    for _ in range(200):
+        ref = " ".join(rng.choice(words) for _ in range(rng.randint(1, 20)))
+        hyp = " ".join(rng.choice(words) for _ in range(rng.randint(0, 20)))
+        S, I, D, edits = brute_force(ref.split(), hyp.split())
+        result = calculate_metrics(ref, hyp)
+        assert (result["S"], result["I"], result["D"]) == (S, I, D)
+        assert [row[2] for row in result["Alignment"]] == [("OK", "S", "D", "I")[e] for e in edits]
+        assert result["WER/CER"] == (S + I + D) / len(ref.split())
+
+        chars = calculate_metrics(ref, hyp, mode="char", counts_only=True)
+        S, I, D, _ = brute_force(list(ref.replace(" ", "_")), list(hyp.replace(" ", "_")))
+        assert (chars["S"], chars["I"], chars["D"]) == (S, I, D)
+        assert chars["Alignment"] is None
+
+
+def test_long_sequences_with_many_tokens(monkeypatch):
+    # tokens frequent enough for the packbits masks, and a block-by-block backtrace
+    monkeypatch.setattr(levenshtein_module, "_BLOCK_BYTES", 4096)
+    rng = np.random.default_rng(0)
+    ref = rng.integers(0, 3, 300)
+    hyp = np.where(rng.random(300) < 0.2, rng.integers(0, 3, 300), ref)[:280]
+    S, I, D, edits = brute_force(ref.tolist(), hyp.tolist())
+    result = levenshtein(ref, hyp)
+    assert (result["S"], result["I"], result["D"]) == (S, I, D)
+    assert result["path"][2].tolist() == edits
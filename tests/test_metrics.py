@@ -0,0 +1,19 @@
+import pytest
+
+from task_2 import calculate_metrics
+
+
+@pytest.mark.parametrize("mode", ["word", "char"])
+def test_empty_hypothesis_is_all_deletions(mode):
+    result = calculate_metrics("a b", "", mode=mode)
+    assert (result["S"], result["I"], result["D"]) == (0, 0, result["N"])
+    assert result["WER/CER"] == 1.0
+    assert result["Alignment"] is not None
+
+
+@pytest.mark.parametrize("mode", ["word", "char"])
+def test_empty_reference_is_all_insertions(mode):
+    result = calculate_metrics("", "a b", mode=mode)
+    assert (result["S"], result["D"], result["N"]) == (0, 0, 0)
+    assert result["I"] == (2 if mode == "word" else 3)
+    assert result["Alignment"] is not None
@@ -0,0 +1,75 @@
+import pytest
+
+from common import model_registry
+from common.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+
+    def load(name, device, dtype):
+        calls.append((name, device, dtype))
+        return object()
+
+    monkeypatch.setitem(model_registry.LOADERS, "fake", load)
+    return calls
+
+
+def test_second_get_is_a_hit(loads):
+    registry = ModelRegistry()
+    first = registry.get("fake", "a")
+    assert registry.get("fake", "a") is first
+    assert len(loads) == 1 and registry.hits == 1 and registry.loads == 1
+
+
+def test_key_includes_device_and_dtype(loads):
+    registry = ModelRegistry()
+    entries = {id(registry.get("fake", "a")), id(registry.get("fake", "a", device="cuda")),
+               id(registry.get("fake", "a", dtype="float16"))}
+    assert len(entries) == 3 and len(loads) == 3
+
+
+def test_least_recently_used_is_evicted(loads):
+    registry = ModelRegistry(max_models=2)
+    registry.get("fake", "a")
+    registry.get("fake", "b")
+    registry.get("fake", "a")
+    registry.get("fake", "c")
+    assert ("fake", "a", "cpu", None, None, None) in registry
+    assert ("fake", "b", "cpu", None, None, None) not in registry
+    assert len(registry) == 2
+
+
+def test_put_and_evict(loads):
+    registry = ModelRegistry()
+    entry = object()
+    registry.put("fake", "a", entry)
+    assert registry.get("fake", "a") is entry and not loads
+    registry.evict(kind="fake")
+    assert len(registry) == 0
+
+
+def test_unknown_variant_raises(loads):
+    with pytest.raises(ValueError):
+        ModelRegistry().get("fake", "a", variant="nope")
+
+
+@pytest.mark.parametrize("variant, quantized", [("cpu-fast", False), ("cpu-fast-pointwise", True)])
+def test_separation_variants(monkeypatch, variant, quantized):
+    models = pytest.importorskip("asteroid.models")
+
+    def load(name, device, dtype):
+        return models.ConvTasNet(n_src=2, n_blocks=2, n_repeats=1, bn_chan=16, hid_chan=32, skip_chan=16,
+                                 n_filters=32, sample_rate=8000).eval()
+
+    monkeypatch.setitem(model_registry.LOADERS, "asteroid", load)
+    model = ModelRegistry().get("asteroid", "tiny", variant=variant)
+    # ConvTasNet is Conv1d-only: plain cpu-fast has nothing to quantize
+    n_quantized = sum(type(m).__module__.startswith("torch.ao.nn") for m in model.modules())
+    assert (n_quantized > 0) == quantized
+
+
+def test_unknown_variant(loads):
+    with pytest.raises(ValueError):
+        ModelRegistry().get("fake", "a", variant="int4")
@@ -0,0 +1,59 @@
+import pytest
+from conftest import random_words
+
+from uk_puntcase.get_predictions import get_word_predictions_batched, window_spans
+
+
+@pytest.mark.parametrize("n_tokens,window,stride", [(1, 4, 2), (10, 4, 4), (10, 4, 1), (23, 5, 3), (100, 22, 11)])
+def test_window_spans_cover_every_token(n_tokens, window, stride):
+    covered = set()
+    for start, end in window_spans(n_tokens, window, stride):
+        assert 0 <= start < end <= n_tokens and end - start <= window
+        covered.update(range(start, end))
+    assert covered == set(range(n_tokens))
+
+
+@pytest.mark.parametrize("stride", [0, -1, 5])
+def test_window_spans_rejects_bad_stride(stride):
+    with pytest.raises(ValueError):
+        window_spans(10, 4, stride)
+
+
+def test_batched_rejects_stride_larger_than_window(tiny_punct_model):
+    _, model, tokenizer = tiny_punct_model
+    with pytest.raises(ValueError):
+        get_word_predictions_batched(model, tokenizer, ["а б в"], window=4, stride=8)
+
+
+def test_sliding_window_predicts_every_word(tiny_punct_model):
+    _, model, tokenizer = tiny_punct_model
+    texts = [random_words(60, seed=1), random_words(5, seed=2)]
+    words, tags = get_word_predictions_batched(model, tokenizer, texts, window=8, stride=8)
+    for text, text_words, text_tags in zip(texts, words, tags):
+        assert len(text_words) == len(text.split())
+        assert len(text_tags) == len(text_words) and all(tag is not None for tag in text_tags)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 32])
+def test_batched_equals_per_sentence(tiny_punct_model, batch_size):
+    from uk_puntcase.get_predictions import get_word_predictions
+
+    _, model, tokenizer = tiny_punct_model
+    texts = [random_words(4, seed=1) + ". " + random_words(6, seed=2) + "?",
+             random_words(3, seed=3),
+             random_words(7, seed=4) + "! " + random_words(2, seed=5)]
+    assert (get_word_predictions_batched(model, tokenizer, texts, batch_size=batch_size)
+            == get_word_predictions(model, tokenizer, texts))
+
+
+def test_evaluate_punctuation_tags_every_word_by_default(tiny_punct_model, capsys):
+    from task4 import evaluate_punctuation
+
+    _, model, tokenizer = tiny_punct_model
+    words = random_words(32, seed=3)
+    evaluate_punctuation(words, words + ".", model=model, tokenizer=tokenizer, device='cpu')
+    assert "Word counts do not match" not in capsys.readouterr().out
+
+    # window=None keeps the legacy truncation at the model limit
+    evaluate_punctuation(words, words + ".", window=None, model=model, tokenizer=tokenizer, device='cpu')
+    assert "Word counts do not match" in capsys.readouterr().out
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from report_writers import ColumnarReportWriter, ReportWriter, write_report
+from task_2 import calculate_metrics
+
+
+def test_report_writer_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        ReportWriter(str(tmp_path / "report.txt"))
+
+
+def test_columnar_report(tmp_path):
+    path = str(tmp_path / "report.npz")
+    write_report("WER", calculate_metrics("а б в", "а г"), path, kind="columnar")
+    with np.load(path) as data:
+        assert data["type"].tolist() == ["OK", "D", "S"]
+
+
+def test_columnar_report_skips_write_on_error(tmp_path):
+    path = tmp_path / "report.npz"
+    with pytest.raises(RuntimeError):
+        with ColumnarReportWriter(str(path)) as writer:
+            writer.write_row("а", "*", "OK")
+            raise RuntimeError("scoring failed")
+    assert not path.exists()
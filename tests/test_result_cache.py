@@ -0,0 +1,39 @@
+import copy
+
+import pytest
+
+from common.cpu_fast import optimize_for_cpu
+from common.result_cache import model_fingerprint
+
+
+@pytest.fixture(scope="module")
+def hub_like_model():
+    transformers = pytest.importorskip("transformers")
+    config = transformers.BertConfig(vocab_size=64, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+                                     intermediate_size=32, max_position_embeddings=32, num_labels=3)
+    model = transformers.BertForTokenClassification(config).eval()
+    # what from_pretrained sets for a hub model
+    model.config._commit_hash = "0123abcd"
+    model.config._name_or_path = "ukr-models/uk-punctcase"
+    return model
+
+
+def test_fingerprint_distinguishes_cpu_fast_variant(hub_like_model):
+    fast = optimize_for_cpu(copy.deepcopy(hub_like_model))
+    assert model_fingerprint(hub_like_model) == "ukr-models/uk-punctcase@0123abcd"
+    assert model_fingerprint(fast) != model_fingerprint(hub_like_model)
+
+
+def test_fingerprint_does_not_keep_model_alive():
+    import gc
+    import weakref
+
+    import torch
+
+    model = torch.nn.Linear(4, 2)
+    first = model_fingerprint(model)
+    assert model_fingerprint(model) == first
+    ref = weakref.ref(model)
+    del model
+    gc.collect()
+    assert ref() is None
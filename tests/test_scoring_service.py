@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "service"))
+from scoring_service import ScoringService, serve
+
+
+def upper_or_fail(texts):
+    if any(text == "boom" for text in texts):
+        raise RuntimeError("bad input")
+    return [{"text": text.upper()} for text in texts]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _with_service(body, **kwargs):
+    service = ScoringService(upper_or_fail, **kwargs)
+    await service.start()
+    try:
+        return await body(service)
+    finally:
+        await service.stop()
+
+
+def test_concurrent_requests_are_batched():
+    async def body(service):
+        results = await asyncio.gather(*(service.dispatch("POST", "/punctuation", json.dumps({"text": t}).encode())
+                                         for t in ["a", "b", "c", "d"]))
+        return results, service.metrics()["punctuation"]
+
+    results, stats = run(_with_service(body, max_batch_size=8, max_wait=0.05))
+    assert [r for r in results] == [(200, {"text": t}) for t in "ABCD"]
+    assert stats["batches"] == 1 and stats["mean_batch_size"] == 4
+
+
+def test_bad_item_fails_only_its_own_request():
+    async def body(service):
+        return await asyncio.gather(*(service.dispatch("POST", "/punctuation", json.dumps({"text": t}).encode())
+                                      for t in ["a", "boom", "c"]))
+
+    statuses = [status for status, _ in run(_with_service(body, max_batch_size=8, max_wait=0.05))]
+    assert statuses == [200, 500, 200]
+
+
+@pytest.mark.parametrize("method,path,body", [
+    ("POST", "/punctuation", b"not json"),
+    ("POST", "/punctuation", b'{"text": 5}'),
+    ("POST", "/wer", b'{"reference": "a"}'),
+    ("POST", "/wer", b'{"reference": "a", "hypothesis": "b", "mode": "phoneme"}'),
+])
+def test_bad_requests_are_400(method, path, body):
+    async def run_one(service):
+        return await service.dispatch(method, path, body)
+
+    assert run(_with_service(run_one))[0] == 400
+
+
+@pytest.mark.parametrize("method,path", [("GET", "/nope"), ("GET", "/wer"), ("POST", "/metrics")])
+def test_unknown_endpoints_are_404(method, path):
+    async def run_one(service):
+        return await service.dispatch(method, path, b"")
+
+    assert run(_with_service(run_one))[0] == 404
+
+
+def test_wer_over_http(tmp_path):
+    socket_path = str(tmp_path / "service.sock")
+
+    async def main():
+        ready = asyncio.Event()
+        server = asyncio.create_task(serve(ScoringService(), unix_socket=socket_path, ready=ready))
+        await ready.wait()
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        body = json.dumps({"reference": "a b c", "hypothesis": "a x c"}).encode()
+        writer.write(b"POST /wer HTTP/1.1\r\nConnection: close\r\nContent-Length: "
+                     + str(len(body)).encode() + b"\r\n\r\n" + body)
+        response = await reader.read()
+        writer.close()
+        server.cancel()
+        try:
+            await server
+        except asyncio.CancelledError:
+            pass
+        return response
+
+    head, _, payload = run(main()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    result = json.loads(payload)
+    assert (result["S"], result["I"], result["D"], result["N"]) == (1, 0, 0, 3)
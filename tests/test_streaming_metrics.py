@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from streaming_metrics import StreamingScorer
+from task_2 import calculate_metrics
+
+WORDS = ["а", "б", "в", "аб", "ба"]
+
+
+def counts(result):
+    return result["S"], result["I"], result["D"], result["N"]
+
+
+def random_text(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+@pytest.mark.parametrize("mode", ["word", "char"])
+def test_matches_calculate_metrics_while_growing(mode):
+    rng = random.Random(1)
+    for _ in range(50):
+        reference = random_text(rng, 0, 12)
+        scorer = StreamingScorer(reference, mode=mode)
+        words = random_text(rng, 0, 15).split()
+        for k, word in enumerate(words, 1):
+            scorer.append(word)
+            expected = calculate_metrics(reference, " ".join(words[:k]), mode=mode, counts_only=True)
+            assert counts(scorer.result()) == counts(expected)
+
+
+@pytest.mark.parametrize("mode", ["word", "char"])
+def test_replace_last(mode):
+    rng = random.Random(2)
+    for _ in range(50):
+        reference = random_text(rng, 1, 12)
+        scorer = StreamingScorer(reference, mode=mode)
+        words = random_text(rng, 1, 12).split()
+        scorer.extend(words)
+        final = rng.choice(WORDS)
+        scorer.replace_last(final)
+        expected = calculate_metrics(reference, " ".join(words[:-1] + [final]), mode=mode, counts_only=True)
+        assert counts(scorer.result()) == counts(expected)
+        assert scorer.words == words[:-1] + [final]
+
+    with pytest.raises(ValueError):
+        StreamingScorer("а б").replace_last("в")
+
+
+def test_band_wide_enough_is_exact():
+    rng = random.Random(3)
+    for _ in range(50):
+        reference = random_text(rng, 0, 12)
+        hypothesis = random_text(rng, 0, 12)
+        scorer = StreamingScorer(reference, band=12)
+        scorer.extend(hypothesis.split())
+        assert counts(scorer.result()) == counts(calculate_metrics(reference, hypothesis, counts_only=True))
+
+
+def test_band_keeps_extra_hypothesis_words_as_insertions():
+    scorer = StreamingScorer("a b", band=1)
+    scorer.extend("a b c d e".split())
+    assert counts(scorer.result()) == (0, 3, 0, 2)
+    assert scorer.result()["WER/CER"] == 1.5
+
+
+def test_band_stores_only_the_band():
+    rng = random.Random(4)
+    reference = random_text(rng, 200, 200)
+    scorer = StreamingScorer(reference, band=5)
+    for word in reference.split()[:50]:
+        scorer.append(word)
+        assert len(scorer._row[2]) <= 2 * 5 + 1
+    # a correct prefix, the rest of the reference is not spoken yet
+    assert counts(scorer.result()) == (0, 0, 150, 200)